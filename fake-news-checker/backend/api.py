@@ -1,18 +1,29 @@
 import uvicorn
+import asyncio
 import os
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from typing import Optional, Literal
+from functools import partial
+from typing import List, Optional, Literal
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, model_validator, Field
 
+from config import Config
 from fact_checker import FactChecker
+from async_crawler import shutdown_async_engine
+from prefetcher import FeedPrefetcher
+from crawl_scheduler import shutdown_crawl_scheduler
+from http_pool import close_sessions
 
 # --- Cấu hình Lifespan (Thay thế cho @app.on_event) ---
 # Khởi tạo một biến toàn cục cho FactChecker
 fact_checker_instance = None
+# Thread pool giới hạn để chạy pipeline (blocking) ngoài event loop
+check_executor = None
+prefetcher = None
 
 
 @asynccontextmanager
@@ -21,13 +32,33 @@ async def lifespan(app: FastAPI):
     Quản lý vòng đời của ứng dụng FastAPI.
     Khởi tạo FactChecker khi server khởi động.
     """
-    global fact_checker_instance
+    global fact_checker_instance, check_executor, prefetcher
     print("Starting up Fact Checker API...")
     fact_checker_instance = FactChecker()
+    check_executor = ThreadPoolExecutor(
+        max_workers=Config.MAX_CONCURRENT_CHECKS, thread_name_prefix="fact-check"
+    )
+    if Config.PREFETCH_ENABLED and fact_checker_instance.article_store:
+        # Nạp nền bài báo mới từ RSS/sitemap vào kho cục bộ
+        prefetcher = FeedPrefetcher(
+            fact_checker_instance.article_store,
+            fact_checker_instance.preprocessor.crawler,
+            fact_checker_instance.similarity_checker,
+            feeds=Config.PREFETCH_FEEDS,
+            max_per_feed=Config.PREFETCH_MAX_PER_FEED,
+            interval_minutes=Config.PREFETCH_INTERVAL_MINUTES,
+        )
+        prefetcher.start()
     print("Fact Checker initialized successfully!")
     yield
-    # (Có thể thêm code dọn dẹp ở đây nếu cần)
     print("Shutting down API...")
+    if prefetcher:
+        prefetcher.stop()
+    check_executor.shutdown(wait=False, cancel_futures=True)
+    shutdown_crawl_scheduler()
+    shutdown_async_engine()
+    fact_checker_instance.searcher.close()
+    close_sessions()
 
 
 # Khởi tạo FastAPI app với lifespan
@@ -59,6 +90,10 @@ class FactCheckRequest(BaseModel):
     num_sources: Optional[int] = Field(
         default=5, ge=1, le=10, description="Số lượng nguồn tham khảo (1-10)"
     )
+    mode: Literal["full", "fast"] = Field(
+        default="full",
+        description="fast: chỉ dùng title/snippet kết quả tìm kiếm, không crawl",
+    )
 
     @model_validator(mode="after")
     def validate_content_based_on_type(self):
@@ -90,6 +125,7 @@ class FactCheckResponse(BaseModel):
     references: Optional[list] = None
     keywords: Optional[list] = None
     timestamp: Optional[str] = None
+    mode: Optional[str] = None
 
 
 # --- API Endpoints ---
@@ -111,7 +147,13 @@ async def health_check():
     return {
         "status": "healthy",
         "fact_checker_initialized": fact_checker_instance is not None,
-        "endpoints": {"check": "/api/check", "health": "/health"},
+        "max_concurrent_checks": Config.MAX_CONCURRENT_CHECKS,
+        "endpoints": {
+            "check": "/api/check",
+            "check_batch": "/api/check/batch",
+            "stats": "/api/stats",
+            "health": "/health",
+        },
     }
 
 
@@ -131,14 +173,21 @@ async def check_fact(request: FactCheckRequest):
         print(f"\n{'='*60}")
         print(f"[API] New request:")
         print(f"  Type: {request.input_type}")
+        print(f"  Mode: {request.mode}")
         print(f"  Content: {request.content[:100]}...")
         print(f"{'='*60}\n")
 
-        # Chạy pipeline kiểm tra
-        result = fact_checker_instance.check_fact(
-            user_input=request.content,
-            input_type=request.input_type,
-            num_sources=request.num_sources,
+        # Chạy pipeline kiểm tra trong thread pool để không chặn event loop
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            check_executor,
+            partial(
+                fact_checker_instance.check_fact,
+                user_input=request.content,
+                input_type=request.input_type,
+                num_sources=request.num_sources,
+                mode=request.mode,
+            ),
         )
 
         print(f"\n[API] Result status: {result['status']}")
@@ -159,6 +208,65 @@ async def check_fact(request: FactCheckRequest):
         raise HTTPException(status_code=500, detail=f"Lỗi xử lý nội bộ: {str(e)}")
 
 
+@app.post("/api/check/batch", response_model=List[FactCheckResponse], tags=["Core"])
+async def check_fact_batch(batch: List[FactCheckRequest]):
+    """
+    Kiểm tra nhiều tin trong một request.
+    Trả về danh sách kết quả theo đúng thứ tự đầu vào.
+    """
+    global fact_checker_instance
+    if fact_checker_instance is None:
+        raise HTTPException(status_code=503, detail="Fact checker chưa được khởi tạo")
+    if not batch:
+        raise HTTPException(status_code=400, detail="Batch không được để trống")
+    if len(batch) > Config.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch quá lớn (tối đa {Config.MAX_BATCH_SIZE} mục)",
+        )
+
+    try:
+        print(f"\n[API] New batch request: {len(batch)} items")
+
+        items = [
+            {
+                "user_input": request.content,
+                "input_type": request.input_type,
+                "num_sources": request.num_sources,
+                "mode": request.mode,
+            }
+            for request in batch
+        ]
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(
+            check_executor, partial(fact_checker_instance.check_fact_batch, items)
+        )
+
+        formatted_results = [
+            fact_checker_instance.format_result_for_frontend(result)
+            for result in results
+        ]
+        return JSONResponse(content=formatted_results)
+
+    except Exception as e:
+        print(f"[API] Exception: {type(e).__name__} - {str(e)}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Lỗi xử lý nội bộ: {str(e)}")
+
+
+@app.get("/api/stats", tags=["Utility"])
+async def get_stats():
+    """Thống kê cache và các lớp tối ưu hiệu năng."""
+    global fact_checker_instance
+    if fact_checker_instance is None:
+        raise HTTPException(status_code=503, detail="Service not ready")
+    # get_stats đọc SQLite (kho bài báo, cache tìm kiếm): chạy ngoài event loop,
+    # trên executor mặc định để không phải chờ sau các check đang chiếm slot
+    stats = await asyncio.to_thread(fact_checker_instance.get_stats)
+    stats["prefetcher"] = prefetcher.stats() if prefetcher else None
+    return stats
+
+
 @app.get("/api/trusted-sources", tags=["Utility"])
 async def get_trusted_sources():
     """Lấy danh sách các nguồn tin uy tín đang được sử dụng."""
@@ -0,0 +1,108 @@
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from url_utils import article_key
+
+logger = logging.getLogger(__name__)
+
+
+class CachedArticle:
+    def __init__(self, article: Dict, etag=None, last_modified=None, expires_at=0.0):
+        self.article = article
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    def conditional_headers(self) -> Dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ArticleCache:
+    """
+    Cache nội dung bài báo đã trích xuất (title/description/content/domain)
+    theo article_key của URL (mọi biến thể URL của một bài dùng chung một
+    phần tử), giới hạn LRU.
+
+    Phần tử hết TTL KHÔNG bị xóa ngay: nó vẫn được giữ lại cùng ETag /
+    Last-Modified để Crawler revalidate bằng conditional GET (304).
+    """
+
+    def __init__(self, ttl_hours: float = 6, max_entries: int = 2000):
+        self.ttl = ttl_hours * 3600
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+    def lookup(self, url: str) -> Optional[CachedArticle]:
+        """Trả về phần tử cache (có thể đã stale - xem `.fresh`), hoặc None."""
+        key = article_key(url)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            if entry.fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return CachedArticle(
+                copy.deepcopy(entry.article),
+                entry.etag,
+                entry.last_modified,
+                entry.expires_at,
+            )
+
+    def set(self, url: str, article: Dict, etag=None, last_modified=None):
+        entry = CachedArticle(
+            copy.deepcopy(article),
+            etag,
+            last_modified,
+            time.monotonic() + self.ttl,
+        )
+        key = article_key(url)
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def touch(self, url: str):
+        """Gia hạn TTL sau khi server trả về 304 Not Modified."""
+        with self._lock:
+            entry = self._data.get(article_key(url))
+            if entry is not None:
+                entry.expires_at = time.monotonic() + self.ttl
+                self.revalidated += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_hours": self.ttl / 3600,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "revalidated_304": self.revalidated,
+                "evictions": self.evictions,
+            }
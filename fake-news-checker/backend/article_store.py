@@ -0,0 +1,324 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from url_utils import article_key
+
+logger = logging.getLogger(__name__)
+
+# Trọng số BM25 cho các cột (title, description, content) của articles_fts
+BM25_WEIGHTS = (5.0, 2.0, 1.0)
+
+
+class ArticleStore:
+    """
+    Kho bài báo cục bộ (SQLite, WAL mode) do FeedPrefetcher nạp dần từ
+    RSS / sitemap của các nguồn uy tín.
+
+    Mỗi bài lưu nội dung đã chuẩn hóa cùng embedding tính sẵn (float32) và
+    tên model đã dùng, để bước so sánh không phải crawl hay encode lại.
+
+    Bài được tra cứu theo article_key (cột url_key), nên các biến thể URL của
+    cùng một bài (utm, m./amp., slug khác) đều trúng cùng một dòng.
+
+    Chỉ mục FTS5 (articles_fts, rowid trùng với articles) cho phép tìm kiếm
+    BM25 cục bộ. Tokenizer unicode61 với remove_diacritics 0 giữ nguyên dấu
+    tiếng Việt, nên "bán" và "ban" là hai từ khác nhau.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS articles (
+                url TEXT PRIMARY KEY,
+                domain TEXT NOT NULL,
+                title TEXT NOT NULL,
+                description TEXT NOT NULL,
+                content TEXT NOT NULL,
+                published TEXT,
+                fetched_at REAL NOT NULL,
+                embedding BLOB,
+                embedding_model TEXT,
+                url_key TEXT NOT NULL
+            )
+            """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_articles_domain ON articles (domain)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_articles_url_key ON articles (url_key)"
+        )
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                title, description, content,
+                tokenize = 'unicode61 remove_diacritics 0'
+            )
+            """)
+        # SimHash của các bài đã crawl (near_duplicates.DuplicateIndex)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                url_key TEXT PRIMARY KEY,
+                simhash INTEGER NOT NULL,
+                cluster TEXT NOT NULL,
+                seen_at REAL NOT NULL
+            )
+            """)
+        # Trạng thái từng feed để poll có điều kiện (ETag / Last-Modified)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS feeds (
+                feed_url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                last_polled REAL NOT NULL
+            )
+            """)
+        logger.info(f"Article store: {self.db_path}")
+
+    def _select_by_key(self, columns: str, urls: Iterable[str], where="", params=()):
+        """
+        Các dòng có url_key trùng với article_key của `urls`. Trả về danh sách
+        (các URL được hỏi ứng với dòng đó, dòng).
+        """
+        by_key: Dict[str, list] = {}
+        for url in dict.fromkeys(urls):
+            by_key.setdefault(article_key(url), []).append(url)
+        keys = list(by_key)
+        matches = []
+        conn = self._connect()
+        # Chia nhỏ để không vượt giới hạn số tham số của SQLite
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT url_key, {columns} FROM articles "
+                f"WHERE url_key IN ({placeholders}){where}",
+                (*chunk, *params),
+            ).fetchall()
+            matches.extend((by_key[row[0]], row[1:]) for row in rows)
+        return matches
+
+    def _connect(self) -> sqlite3.Connection:
+        # Mỗi thread dùng connection riêng; SQLite xử lý khóa giữa các process
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def known_urls(self, urls: Iterable[str]) -> Set[str]:
+        """Các URL trong `urls` đã có trong kho (kể cả dưới URL khác của cùng bài)."""
+        known = set()
+        for requested, _ in self._select_by_key("url", urls):
+            known.update(requested)
+        return known
+
+    def add(
+        self,
+        article: Dict,
+        embedding=None,
+        embedding_model: Optional[str] = None,
+        published: Optional[str] = None,
+    ):
+        blob = (
+            np.asarray(embedding, dtype=np.float32).tobytes()
+            if embedding is not None
+            else None
+        )
+        title = article.get("title", "")
+        description = article.get("description", "")
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN")
+            # Upsert giữ nguyên rowid, nên dòng FTS tương ứng được thay thế tại chỗ
+            rowid = conn.execute(
+                "INSERT INTO articles (url, domain, title, description, content, "
+                "published, fetched_at, embedding, embedding_model, url_key) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET domain = excluded.domain, "
+                "title = excluded.title, description = excluded.description, "
+                "content = excluded.content, published = excluded.published, "
+                "fetched_at = excluded.fetched_at, embedding = excluded.embedding, "
+                "embedding_model = excluded.embedding_model, "
+                "url_key = excluded.url_key "
+                "RETURNING rowid",
+                (
+                    article["url"],
+                    article.get("domain", ""),
+                    title,
+                    description,
+                    article["content"],
+                    published,
+                    time.time(),
+                    blob,
+                    embedding_model if blob is not None else None,
+                    article_key(article["url"]),
+                ),
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO articles_fts "
+                "(rowid, title, description, content) VALUES (?, ?, ?, ?)",
+                (rowid, title, description, article["content"]),
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.warning(f"Article store write failed for {article['url']}: {e}")
+
+    def get_many(self, urls: Iterable[str]) -> Dict[str, Dict]:
+        """Trả về dict url -> bài báo (cùng dạng với Crawler.extract_from_url)."""
+        articles = {}
+        for requested, row in self._select_by_key(
+            "url, domain, title, description, content", urls
+        ):
+            url, domain, title, description, content = row
+            for requested_url in requested:
+                articles[requested_url] = {
+                    "title": title,
+                    "description": description,
+                    "content": content,
+                    "url": url,
+                    "domain": domain,
+                }
+        return articles
+
+    def embeddings_for(
+        self, urls: Iterable[str], embedding_model: str
+    ) -> Dict[str, np.ndarray]:
+        """Embedding tính sẵn (chỉ những bài encode bằng đúng `embedding_model`)."""
+        embeddings = {}
+        for requested, (blob,) in self._select_by_key(
+            "embedding", urls, " AND embedding_model = ?", (embedding_model,)
+        ):
+            for requested_url in requested:
+                embeddings[requested_url] = np.frombuffer(blob, dtype=np.float32)
+        return embeddings
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Tìm kiếm BM25 trên title/description/content. Mỗi từ của `query` là
+        một term (OR); thêm các cặp từ liền kề dạng cụm từ để ưu tiên bài chứa
+        đúng từ ghép tiếng Việt (vd. "chính phủ").
+        Trả về [{url, title, snippet, domain, score}] theo điểm giảm dần.
+        """
+        expression = self._match_expression(query)
+        if not expression:
+            return []
+        try:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT a.url, a.domain, a.title, a.description, "
+                    "snippet(articles_fts, 2, '', '', '…', 32), "
+                    "bm25(articles_fts, ?, ?, ?) AS score "
+                    "FROM articles_fts JOIN articles a ON a.rowid = articles_fts.rowid "
+                    "WHERE articles_fts MATCH ? ORDER BY score LIMIT ?",
+                    (*BM25_WEIGHTS, expression, limit),
+                )
+                .fetchall()
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Local search failed for '{query[:50]}': {e}")
+            return []
+        return [
+            {
+                "url": url,
+                "title": title,
+                "snippet": description or snippet,
+                "domain": domain,
+                # bm25() càng âm càng liên quan
+                "score": -score,
+            }
+            for url, domain, title, description, snippet, score in rows
+        ]
+
+    @staticmethod
+    def _match_expression(query: str) -> str:
+        words = re.findall(r"\w+", query.lower())
+        terms = list(dict.fromkeys(words))
+        phrases = list(dict.fromkeys(f"{a} {b}" for a, b in zip(words, words[1:])))
+        return " OR ".join(f'"{term}"' for term in phrases + terms)
+
+    def load_fingerprints(self, limit: int) -> List[Tuple[str, int, str]]:
+        """`limit` fingerprint mới nhất, cũ trước: [(url_key, simhash, cụm)]."""
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT url_key, simhash, cluster FROM fingerprints "
+                "ORDER BY seen_at DESC LIMIT ?",
+                (limit,),
+            )
+            .fetchall()
+        )
+        rows.reverse()
+        # SQLite lưu INTEGER có dấu: đổi lại về số 64 bit không dấu
+        return [(key, simhash % (1 << 64), cluster) for key, simhash, cluster in rows]
+
+    def add_fingerprint(self, url_key: str, simhash: int, cluster: str):
+        signed = simhash - (1 << 64) if simhash >= 1 << 63 else simhash
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO fingerprints "
+                "(url_key, simhash, cluster, seen_at) VALUES (?, ?, ?, ?)",
+                (url_key, signed, cluster, time.time()),
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Fingerprint write failed for {url_key}: {e}")
+
+    def feed_state(self, feed_url: str) -> Optional[Dict]:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT etag, last_modified, last_polled FROM feeds WHERE feed_url = ?",
+                (feed_url,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "last_polled": row[2]}
+
+    def set_feed_state(self, feed_url: str, etag=None, last_modified=None):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO feeds "
+            "(feed_url, etag, last_modified, last_polled) VALUES (?, ?, ?, ?)",
+            (feed_url, etag, last_modified, time.time()),
+        )
+
+    def stats(self) -> Dict:
+        try:
+            conn = self._connect()
+            by_domain = dict(
+                conn.execute(
+                    "SELECT domain, COUNT(*) FROM articles GROUP BY domain"
+                ).fetchall()
+            )
+            with_embedding = conn.execute(
+                "SELECT COUNT(*) FROM articles WHERE embedding IS NOT NULL"
+            ).fetchone()[0]
+            feeds = conn.execute("SELECT COUNT(*) FROM feeds").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Article store stats failed: {e}")
+            return {"path": self.db_path}
+        return {
+            "path": self.db_path,
+            "articles": sum(by_domain.values()),
+            "by_domain": by_domain,
+            "with_embedding": with_embedding,
+            "feeds": feeds,
+        }
@@ -0,0 +1,352 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Callable, Dict, Optional
+
+from curl_cffi.requests import AsyncSession
+
+from config import Config
+from crawl_scheduler import domain_key
+from crawler import FetchedPage, StreamReader
+from url_utils import article_key, host_key
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCrawlEngine:
+    """
+    Engine crawl chạy trên MỘT event loop (thread nền riêng) với curl_cffi
+    AsyncSession: hàng nghìn fetch có thể cùng chờ mạng mà không cần một
+    thread cho mỗi fetch.
+
+    - Parse HTML + trích keyword chạy trên pool CPU (`parse_workers` thread,
+      HTML_PARSER=lxml nhả GIL khi parse) để không chặn event loop
+    - Giới hạn theo domain (số fetch đồng thời + khoảng cách tối thiểu) giống
+      CrawlScheduler, nhưng chỉ giữ slot trong lúc fetch, không trong lúc parse
+    - Job cho cùng một bài (article_key) đang chạy được gộp lại
+    - Dùng lại logic của Crawler: cache bài báo, circuit breaker, đọc stream
+      có cắt sớm, hedge sang archive.org và hạn chót cho mỗi URL
+
+    Code đồng bộ gọi submit() và nhận concurrent.futures.Future.
+    """
+
+    def __init__(
+        self,
+        max_clients: int,
+        parse_workers: int,
+        per_domain: int,
+        min_interval: float,
+    ):
+        self.per_domain = per_domain
+        self.min_interval = min_interval
+        self._parse_pool = ThreadPoolExecutor(
+            max_workers=parse_workers, thread_name_prefix="crawl-parse"
+        )
+        # archive.org / snippet Google vẫn là code đồng bộ (requests), hiếm khi chạy
+        self._fallback_pool = ThreadPoolExecutor(
+            max_workers=8, thread_name_prefix="crawl-fallback"
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="async-crawl", daemon=True
+        )
+        self._thread.start()
+        # Các dict dưới đây chỉ được truy cập từ thread của event loop
+        self._jobs: Dict[str, asyncio.Task] = {}
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+        self.submitted = 0
+        self.merged = 0
+        self.completed = 0
+        self.failed = 0
+        self._session = asyncio.run_coroutine_threadsafe(
+            self._create_session(max_clients), self._loop
+        ).result()
+        logger.info(
+            f"Async crawl engine: {max_clients} clients, {parse_workers} parse "
+            f"workers, {per_domain} per domain"
+        )
+
+    async def _create_session(self, max_clients):
+        # Như http_pool: không giữ cookie giữa các request (chỉ trong redirect)
+        return AsyncSession(max_clients=max_clients, discard_cookies=True)
+
+    def submit(
+        self, url: str, crawler, postprocess: Optional[Callable] = None
+    ) -> Future:
+        """
+        Crawl `url` bằng cấu hình của `crawler`. Nếu có `postprocess`, kết quả
+        là postprocess(url, bài_báo) (chạy trên pool CPU), ngược lại là bài báo.
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self._submit(url, crawler, postprocess), self._loop
+        )
+
+    async def _submit(self, url, crawler, postprocess):
+        key = article_key(url)
+        task = self._jobs.get(key)
+        if task is not None:
+            self.merged += 1
+        else:
+            self.submitted += 1
+            task = asyncio.ensure_future(self._job(url, crawler, postprocess))
+            self._jobs[key] = task
+            task.add_done_callback(partial(self._job_done, key))
+        # shield: một caller bị hủy không làm hủy job của các caller khác
+        return await asyncio.shield(task)
+
+    def _job_done(self, key, task):
+        self._jobs.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+    async def _job(self, url, crawler, postprocess):
+        article = await self.extract(url, crawler)
+        if article is None or postprocess is None:
+            return article
+        return await self._loop.run_in_executor(
+            self._parse_pool, postprocess, url, article
+        )
+
+    async def extract(self, url, crawler) -> Optional[Dict]:
+        """Bản async của Crawler.extract_from_url."""
+        if not crawler.is_valid_article_url(url):
+            logger.warning(f"URL may not be a valid article: {url}")
+
+        article, cached = crawler._from_cache(url)
+        if article:
+            return article
+        if crawler._known_failure(url):
+            return None
+
+        deadline = time.monotonic() + Config.CRAWL_DEADLINE_S
+        try:
+            result = await asyncio.wait_for(
+                self._extract_hedged(url, crawler, cached, deadline),
+                timeout=Config.CRAWL_DEADLINE_S,
+            )
+        except asyncio.TimeoutError:
+            result = None
+        if result:
+            return result
+
+        if time.monotonic() >= deadline:
+            crawler._count("deadline_exceeded")
+            logger.error(f"Extraction deadline exceeded for {url}")
+            crawler._remember_failure(url)
+            return None
+
+        logger.warning("Method 2 failed, trying search snippet extraction...")
+        result = await self._loop.run_in_executor(
+            self._fallback_pool,
+            partial(crawler._try_search_snippet_method, url, deadline=deadline),
+        )
+        if result:
+            return result
+
+        logger.error("All extraction methods failed")
+        crawler._remember_failure(url)
+        return None
+
+    async def _extract_hedged(self, url, crawler, cached, deadline):
+        primary = asyncio.ensure_future(self._fetch_with_retries(url, crawler, cached))
+        hedge = None
+        try:
+            # Không hedge: chờ fetch chính xong rồi mới thử archive.org
+            timeout = crawler._hedge_delay() if Config.HEDGED_FETCH else None
+            done, _ = await asyncio.wait({primary}, timeout=timeout)
+            if primary in done:
+                result = primary.result()
+                if result:
+                    return result
+                logger.warning("Method 1 failed, trying archive.org proxy...")
+            else:
+                crawler._count("hedges_started")
+                logger.info(
+                    f"Primary fetch slow (> {crawler._hedge_delay():.1f}s), "
+                    f"hedging with archive.org: {url}"
+                )
+
+            hedge = asyncio.ensure_future(self._archive(url, crawler, deadline))
+            pending = {primary, hedge} - done
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    result = task.result()
+                    if result:
+                        if task is hedge and not primary.done():
+                            crawler._count("hedge_wins")
+                            logger.info(f"Hedged archive.org fetch won for {url}")
+                        return result
+            return None
+        finally:
+            # Hủy thật sự nhánh thua (task asyncio), kể cả khi hết hạn chót
+            primary.cancel()
+            if hedge is not None:
+                hedge.cancel()
+
+    async def _archive(self, url, crawler, deadline):
+        result = await self._loop.run_in_executor(
+            self._fallback_pool,
+            partial(crawler._try_archive_method, url, deadline=deadline),
+        )
+        if result and crawler.article_cache:
+            crawler.article_cache.set(url, result)
+        return result
+
+    async def _fetch_with_retries(self, url, crawler, cached, max_retries=3):
+        domain = host_key(url)
+        breaker = crawler.circuit_breaker
+        for attempt in range(max_retries):
+            if breaker and not breaker.allow(domain):
+                logger.warning(
+                    f"Skipping curl_cffi: circuit open for {domain} "
+                    f"(retry in {breaker.retry_in(domain):.0f}s)"
+                )
+                return None
+            headers = crawler._build_headers(url)
+            if cached is not None and attempt == 0:
+                # Bài đã stale trong cache: conditional GET
+                headers.update(cached.conditional_headers())
+            logger.info(
+                f"Attempt {attempt + 1}/{max_retries}: Extracting from {url} using AsyncSession"
+            )
+
+            started = time.monotonic()
+            try:
+                async with self._domain_slot(domain_key(url)):
+                    page = await self._fetch(url, headers)
+            except asyncio.CancelledError:
+                # Nhánh thua của hedge: không tính là lỗi, nhưng phải trả lại
+                # lượt probe half-open nếu request này đang giữ nó
+                if breaker:
+                    breaker.release(domain)
+                raise
+            except Exception as e:
+                crawler._record_outcome(domain, None, time.monotonic() - started)
+                logger.warning(f"Attempt {attempt + 1} failed: {str(e)}")
+            else:
+                latency = time.monotonic() - started
+                crawler._record_outcome(domain, page.status_code, latency)
+                if page.status_code == 304 and cached is not None:
+                    logger.info(f"Article not modified (304): {url}")
+                    crawler.article_cache.touch(url)
+                    return cached.article
+                if page.status_code == 200:
+                    crawler.latency.record(latency)
+                    result = await self._loop.run_in_executor(
+                        self._parse_pool, crawler._parse_article, page.content, url
+                    )
+                    if result:
+                        logger.info(
+                            f"Successfully extracted {len(result['content'])} characters (via AsyncSession)"
+                        )
+                        crawler._cache_response(url, result, page)
+                        return result
+                logger.warning(
+                    f"Attempt {attempt + 1} failed: Status {page.status_code}"
+                )
+
+            if attempt < max_retries - 1:
+                await asyncio.sleep(random.uniform(2, 5))
+        return None
+
+    @asynccontextmanager
+    async def _domain_slot(self, domain):
+        semaphore = self._slots.get(domain)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_domain)
+            self._slots[domain] = semaphore
+        async with semaphore:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(domain, 0.0))
+            self._next_start[domain] = start + self.min_interval
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
+
+    async def _fetch(self, url, headers, timeout=30) -> FetchedPage:
+        response = await self._session.get(
+            url,
+            headers=headers,
+            timeout=timeout,
+            allow_redirects=True,
+            verify=True,
+            impersonate="chrome120",
+            stream=True,
+        )
+        try:
+            if response.status_code != 200:
+                return FetchedPage(response.status_code, response.headers, b"")
+            if not Config.STREAM_FETCH:
+                content = b"".join([chunk async for chunk in response.aiter_content()])
+                return FetchedPage(response.status_code, response.headers, content)
+            reader = StreamReader(url)
+            async for chunk in response.aiter_content(chunk_size=16384):
+                if reader.feed(chunk):
+                    break
+            content, truncated = reader.result()
+            return FetchedPage(
+                response.status_code, response.headers, content, truncated
+            )
+        finally:
+            await response.aclose()
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._jobs),
+            "submitted": self.submitted,
+            "merged": self.merged,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    def shutdown(self):
+        async def close():
+            for task in list(self._jobs.values()):
+                task.cancel()
+            await self._session.close()
+
+        try:
+            asyncio.run_coroutine_threadsafe(close(), self._loop).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"Async crawl engine shutdown: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._parse_pool.shutdown(wait=False, cancel_futures=True)
+        self._fallback_pool.shutdown(wait=False, cancel_futures=True)
+
+
+_engine: Optional[AsyncCrawlEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_async_engine() -> AsyncCrawlEngine:
+    """Engine dùng chung toàn process, tạo lười ở lần dùng đầu tiên."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = AsyncCrawlEngine(
+                    max_clients=Config.ASYNC_MAX_CLIENTS,
+                    parse_workers=Config.PARSE_WORKERS,
+                    per_domain=Config.CRAWL_DOMAIN_CONCURRENCY,
+                    min_interval=Config.CRAWL_DOMAIN_MIN_INTERVAL_S,
+                )
+    return _engine
+
+
+def shutdown_async_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.shutdown()
+            _engine = None
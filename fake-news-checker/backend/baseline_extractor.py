@@ -0,0 +1,149 @@
+"""
+Bản sao cố định của bộ trích xuất bài báo TRƯỚC khi có html_parser
+(BeautifulSoup + html.parser, mỗi container gọi find_all("p") riêng).
+
+Không dùng trong luồng crawl: chỉ làm chuẩn đối chiếu cho bench_parsers.py
+và các test parity. Đừng sửa logic ở đây khi thay đổi Crawler, nếu không
+phép so sánh sẽ mất ý nghĩa.
+"""
+
+import re
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+
+from text_utils import normalize_text
+
+REMOVED_TAGS = ["script", "style", "iframe", "noscript", "nav", "footer", "header"]
+
+
+def parse_article(html, url) -> Optional[Dict]:
+    """Giống Crawler._parse_article: trả về None nếu nội dung quá ngắn."""
+    title, description, content = extract(html, url)
+    if content and len(content) > 100:
+        return {
+            "title": normalize_text(title),
+            "description": normalize_text(description),
+            "content": normalize_text(content),
+            "url": url,
+            "domain": urlparse(url).netloc,
+        }
+    return None
+
+
+def extract(html, url):
+    """Trả về (title, description, content) chưa chuẩn hóa."""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(REMOVED_TAGS):
+        tag.decompose()
+    return (
+        _extract_title(soup),
+        _extract_description(soup),
+        _extract_content(soup, url),
+    )
+
+
+def _extract_title(soup):
+    title = ""
+    title_tag = soup.find("title")
+    if title_tag:
+        title = title_tag.get_text().strip()
+
+    if not title:
+        h1 = soup.find("h1")
+        if h1:
+            title = h1.get_text().strip()
+
+    if not title:
+        meta_title = soup.find("meta", property="og:title")
+        if meta_title and meta_title.has_attr("content"):
+            title = meta_title["content"].strip()
+
+    return title
+
+
+def _extract_description(soup):
+    description = ""
+    meta_desc = soup.find("meta", attrs={"name": "description"})
+    if not meta_desc:
+        meta_desc = soup.find("meta", attrs={"property": "og:description"})
+
+    if meta_desc and meta_desc.has_attr("content"):
+        description = meta_desc["content"].strip()
+
+    return description
+
+
+def _extract_content(soup, url):
+    content = ""
+    domain = urlparse(url).netloc
+
+    article = soup.find("article")
+    if article:
+        content = _extract_paragraphs(article)
+        if len(content) > 200:
+            return content
+
+    if not content or len(content) < 200:
+        content_divs = soup.find_all(
+            "div",
+            class_=re.compile(r"(content|article|body|detail|story|entry|post)", re.I),
+        )
+        for div in content_divs:
+            temp_content = _extract_paragraphs(div)
+            if len(temp_content) > len(content):
+                content = temp_content
+                if len(content) > 500:
+                    break
+
+    if not content or len(content) < 200:
+        content = _extract_domain_specific(soup, domain)
+
+    if not content or len(content) < 200:
+        paragraphs = soup.find_all("p")
+        texts = [
+            p.get_text().strip() for p in paragraphs if len(p.get_text().strip()) > 30
+        ]
+        content = " ".join(texts[:50])
+
+    return content
+
+
+def _extract_paragraphs(element):
+    paragraphs = element.find_all("p")
+    texts = [p.get_text().strip() for p in paragraphs if len(p.get_text().strip()) > 30]
+    return " ".join(texts)
+
+
+def _extract_domain_specific(soup, domain):
+    content = ""
+
+    if "vnexpress.net" in domain:
+        vnexpress = soup.find(["article", "div"], class_="fck_detail")
+        if vnexpress:
+            content = _extract_paragraphs(vnexpress)
+
+    elif "tuoitre.vn" in domain:
+        tuoitre = soup.find("div", id="main-detail-content")
+        if tuoitre:
+            content = _extract_paragraphs(tuoitre)
+
+    elif "thanhnien.vn" in domain:
+        thanhnien = soup.find("div", class_=re.compile("content|detail|body", re.I))
+        if thanhnien:
+            content = _extract_paragraphs(thanhnien)
+
+    elif "dantri.com.vn" in domain:
+        dantri = soup.find("div", class_=re.compile("detail|content", re.I))
+        if dantri:
+            content = _extract_paragraphs(dantri)
+
+    elif "vietnamnet.vn" in domain:
+        vietnamnet = soup.find(
+            "div", class_=re.compile("main-content|article-content", re.I)
+        )
+        if vietnamnet:
+            content = _extract_paragraphs(vietnamnet)
+
+    return content
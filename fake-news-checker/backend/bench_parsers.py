@@ -0,0 +1,132 @@
+"""
+Benchmark các HTML parser backend của Crawler trên các trang đã lưu, đối
+chiếu với bộ trích xuất gốc (baseline_extractor, BeautifulSoup trước khi có
+html_parser).
+
+Cách dùng:
+    python bench_parsers.py <thư_mục_html> [--repeat 5]
+
+Tên file nên bắt đầu bằng domain (vd: vnexpress.net_abc.html) để
+logic trích xuất theo domain được áp dụng đúng.
+
+Khác biệt đã biết so với baseline:
+- bs4: không có (cùng html.parser, kết quả phải giống hệt)
+- lxml: libxml2 sửa HTML lỗi theo cách khác html.parser
+  * <p> lồng nhau / <p> không đóng: <p> trước bị đóng ngầm, các đoạn thành
+    anh em. Baseline lặp lại text của <p> con trong <p> cha, lxml thì không
+  * thẻ khối (<div>, <table>, <ul>...) bên trong <p>: <p> bị đóng tại thẻ
+    khối, phần text trong thẻ khối và sau nó không còn nằm trong <p> nào nên
+    bị bỏ qua
+  Vì vậy HTML_PARSER mặc định vẫn là "bs4"; chỉ bật lxml khi bảng so sánh
+  dưới đây cho thấy các trang cần quan tâm không bị ảnh hưởng.
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import time
+
+import baseline_extractor
+from crawler import Crawler
+from html_parser import LXML_AVAILABLE
+
+BASELINE = "baseline"
+
+
+def load_pages(directory):
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith((".html", ".htm")):
+            continue
+        with open(os.path.join(directory, name), "rb") as f:
+            html = f.read()
+        domain = name.split("_")[0]
+        url = f"https://{domain}/{os.path.splitext(name)[0]}-bench.html"
+        pages.append((name, url, html))
+    return pages
+
+
+def bench_backend(backend, pages, repeat):
+    if backend == BASELINE:
+        parse_article = baseline_extractor.parse_article
+    else:
+        parse_article = Crawler(parser_backend=backend)._parse_article
+    timings = {}
+    outputs = {}
+    for name, url, html in pages:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            outputs[name] = parse_article(html, url)
+            samples.append(time.perf_counter() - start)
+        timings[name] = statistics.median(samples)
+    return timings, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("directory")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    pages = load_pages(args.directory)
+    if not pages:
+        print(f"No .html files in {args.directory}")
+        return
+
+    backends = [BASELINE, "bs4"] + (["lxml"] if LXML_AVAILABLE else [])
+    results = {b: bench_backend(b, pages, args.repeat) for b in backends}
+
+    header = f"{'page':40} {'KB':>7}" + "".join(f" {b + ' ms':>10}" for b in backends)
+    print(header)
+    print("-" * len(header))
+    for name, _, html in pages:
+        row = f"{name[:40]:40} {len(html) / 1024:7.0f}"
+        for b in backends:
+            row += f" {results[b][0][name] * 1000:10.1f}"
+        print(row)
+
+    print("-" * len(header))
+    totals = {b: sum(results[b][0].values()) for b in backends}
+    print(
+        f"{'TOTAL':40} {'':>7}"
+        + "".join(f" {totals[b] * 1000:10.1f}" for b in backends)
+    )
+    for b in backends[1:]:
+        print(f"Speedup {b} vs {BASELINE}: {totals[BASELINE] / totals[b]:.1f}x")
+
+    # Kiểm tra từng backend cho ra cùng kết quả trích xuất với baseline
+    for b in backends[1:]:
+        mismatches = [
+            name
+            for name, _, _ in pages
+            if results[b][1][name] != results[BASELINE][1][name]
+        ]
+        status = "identical" if not mismatches else f"DIFF on {mismatches}"
+        print(f"Output {b} vs {BASELINE}: {status}")
+        for name in mismatches:
+            print_diff(name, results[BASELINE][1][name], results[b][1][name])
+
+
+def print_diff(name, expected, actual):
+    if expected is None or actual is None:
+        print(f"  {name}: {BASELINE}={expected is not None}, got={actual is not None}")
+        return
+    for field in ("title", "description", "content"):
+        a, b = expected[field], actual[field]
+        if a == b:
+            continue
+        # Vị trí khác nhau đầu tiên, kèm một đoạn ngữ cảnh
+        pos = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), None)
+        if pos is None:
+            pos = min(len(a), len(b))
+        start = max(0, pos - 30)
+        print(f"  {name} [{field}] {len(a)} vs {len(b)} chars, first diff at {pos}")
+        print(f"    {BASELINE}: {a[start : pos + 50]!r}")
+        print(f"    got:      {b[start : pos + 50]!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Domain đang bị ngắt mạch, không gửi request."""
+
+    def __init__(self, domain: str, retry_in: float):
+        super().__init__(f"Circuit open for {domain} (retry in {retry_in:.0f}s)")
+        self.domain = domain
+        self.retry_in = retry_in
+
+
+class DomainHealth:
+    def __init__(self, window: int):
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=window)  # True = thành công
+        self.latency_ewma: Optional[float] = None
+        self.opened_until = 0.0
+        self.open_seconds = 0.0
+        self.probe_in_flight = False
+        self.trips = 0
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+
+class CircuitBreaker:
+    """
+    Theo dõi sức khỏe từng domain: tỉ lệ lỗi trên cửa sổ `window` request
+    gần nhất và EWMA độ trễ.
+
+    - closed:    cho phép request; tỉ lệ lỗi ≥ `error_threshold` (với ít nhất
+                 `min_requests` mẫu) → open
+    - open:      từ chối ngay trong `open_seconds`; mỗi lần mở lại liên tiếp
+                 thời gian này nhân đôi (tối đa `max_open_seconds`)
+    - half_open: hết thời gian open → cho đúng một request thử; thành công →
+                 closed, thất bại → open lại
+
+    Request chậm hơn `slow_call_seconds` được tính là lỗi.
+    """
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_requests: int = 5,
+        error_threshold: float = 0.5,
+        open_seconds: float = 30,
+        max_open_seconds: float = 600,
+        slow_call_seconds: float = 15,
+        latency_alpha: float = 0.3,
+    ):
+        self.window = window
+        self.min_requests = min_requests
+        self.error_threshold = error_threshold
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.latency_alpha = latency_alpha
+        self._domains: Dict[str, DomainHealth] = {}
+        self._lock = threading.Lock()
+
+    def _health(self, domain: str) -> DomainHealth:
+        health = self._domains.get(domain)
+        if health is None:
+            health = DomainHealth(self.window)
+            self._domains[domain] = health
+        return health
+
+    def allow(self, domain: str) -> bool:
+        """True nếu được gửi request tới domain (half_open: chỉ một probe)."""
+        with self._lock:
+            health = self._health(domain)
+            if health.state == CLOSED:
+                return True
+            if health.state == OPEN and time.monotonic() >= health.opened_until:
+                health.state = HALF_OPEN
+                logger.info(f"Circuit half-open for {domain}, sending probe")
+            if health.state == HALF_OPEN and not health.probe_in_flight:
+                health.probe_in_flight = True
+                return True
+            health.rejected += 1
+            return False
+
+    def is_open(self, domain: str) -> bool:
+        """Kiểm tra trạng thái mà không chiếm lượt probe."""
+        with self._lock:
+            health = self._domains.get(domain)
+            return (
+                health is not None
+                and health.state == OPEN
+                and time.monotonic() < health.opened_until
+            )
+
+    def retry_in(self, domain: str) -> float:
+        with self._lock:
+            health = self._domains.get(domain)
+            if health is None:
+                return 0.0
+            return max(0.0, health.opened_until - time.monotonic())
+
+    def release(self, domain: str):
+        """Trả lại lượt probe khi request bị hủy trước khi có kết quả."""
+        with self._lock:
+            health = self._domains.get(domain)
+            if health is not None and health.state == HALF_OPEN:
+                health.probe_in_flight = False
+
+    def record_success(self, domain: str, latency: Optional[float] = None):
+        if latency is not None and latency > self.slow_call_seconds:
+            self.record_failure(domain, latency)
+            return
+        with self._lock:
+            health = self._health(domain)
+            health.successes += 1
+            self._update_latency(health, latency)
+            health.outcomes.append(True)
+            if health.state == HALF_OPEN:
+                health.state = CLOSED
+                health.probe_in_flight = False
+                health.open_seconds = 0.0
+                health.outcomes.clear()
+                logger.info(f"Circuit closed for {domain}")
+
+    def record_failure(self, domain: str, latency: Optional[float] = None):
+        with self._lock:
+            health = self._health(domain)
+            health.failures += 1
+            self._update_latency(health, latency)
+            health.outcomes.append(False)
+            if health.state == HALF_OPEN:
+                health.probe_in_flight = False
+                self._trip(domain, health)
+            elif (
+                health.state == CLOSED
+                and len(health.outcomes) >= self.min_requests
+                and health.error_rate >= self.error_threshold
+            ):
+                self._trip(domain, health)
+
+    def _trip(self, domain: str, health: DomainHealth):
+        # Backoff thích ứng: mở lại liên tiếp → thời gian open tăng gấp đôi
+        health.open_seconds = min(
+            self.max_open_seconds,
+            (health.open_seconds * 2) or self.base_open_seconds,
+        )
+        health.state = OPEN
+        health.opened_until = time.monotonic() + health.open_seconds
+        health.trips += 1
+        logger.warning(
+            f"Circuit OPEN for {domain}: error rate {health.error_rate:.0%}, "
+            f"retry in {health.open_seconds:.0f}s"
+        )
+
+    def _update_latency(self, health: DomainHealth, latency: Optional[float]):
+        if latency is None:
+            return
+        if health.latency_ewma is None:
+            health.latency_ewma = latency
+        else:
+            health.latency_ewma += self.latency_alpha * (latency - health.latency_ewma)
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                domain: {
+                    "state": health.state,
+                    "error_rate": round(health.error_rate, 3),
+                    "latency_ewma_s": (
+                        round(health.latency_ewma, 3)
+                        if health.latency_ewma is not None
+                        else None
+                    ),
+                    "retry_in_s": (
+                        round(max(0.0, health.opened_until - now), 1)
+                        if health.state == OPEN
+                        else 0.0
+                    ),
+                    "trips": health.trips,
+                    "successes": health.successes,
+                    "failures": health.failures,
+                    "rejected": health.rejected,
+                }
+                for domain, health in self._domains.items()
+            }
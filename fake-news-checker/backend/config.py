@@ -11,8 +11,101 @@ class Config:
 
     NEWS_API_KEY = os.getenv("NEWS_API_KEY", None)
 
+    # Token bucket toàn process cho Google CSE (mặc định ~90 truy vấn/phút)
+    CSE_RATE_PER_SECOND = float(os.getenv("CSE_RATE_PER_SECOND", "1.5"))
+    CSE_BURST = int(os.getenv("CSE_BURST", "3"))
+
+    # HTTP connection pool dùng chung (keep-alive) cho crawler và search
+    HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "20"))
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))  # mỗi host
+
     ENABLE_CACHE = os.getenv("ENABLE_CACHE", "true").lower() == "true"
     CACHE_TTL_HOURS = int(os.getenv("CACHE_TTL_HOURS", "24"))
+    # "memory" (mỗi process một dict) hoặc "sqlite" (chia sẻ giữa các worker)
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+    CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "search_cache.sqlite3")
+    # Giới hạn bộ nhớ cho cache tìm kiếm in-memory (LRU)
+    SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1000"))
+    SEARCH_CACHE_MAX_MB = int(os.getenv("SEARCH_CACHE_MAX_MB", "50"))
+    # Negative cache (TTL ngắn, 0 = tắt): truy vấn không có kết quả và URL
+    # đã thất bại ở mọi phương pháp crawl
+    SEARCH_NEGATIVE_TTL_MINUTES = float(os.getenv("SEARCH_NEGATIVE_TTL_MINUTES", "10"))
+    CRAWL_NEGATIVE_TTL_MINUTES = float(os.getenv("CRAWL_NEGATIVE_TTL_MINUTES", "30"))
+    # Cache nội dung bài báo đã crawl (hết hạn → revalidate ETag/Last-Modified)
+    ARTICLE_CACHE_TTL_HOURS = float(os.getenv("ARTICLE_CACHE_TTL_HOURS", "6"))
+    ARTICLE_CACHE_MAX_ENTRIES = int(os.getenv("ARTICLE_CACHE_MAX_ENTRIES", "2000"))
+
+    # HTML parser cho crawler: "bs4" (html.parser, giống hệt bộ trích xuất cũ)
+    # hoặc "lxml" (nhanh, C; khác bs4 trên HTML lỗi, xem bench_parsers.py)
+    HTML_PARSER = os.getenv("HTML_PARSER", "bs4").lower()
+    # Đọc trang bài báo dạng stream: dừng khi vượt ngân sách byte hoặc khi
+    # thân bài đã kết thúc (marker theo domain, xem STREAM_RULES trong crawler)
+    STREAM_FETCH = os.getenv("STREAM_FETCH", "true").lower() == "true"
+    CRAWL_MAX_KB = int(os.getenv("CRAWL_MAX_KB", "3072"))
+    # Hedged fetch: nếu curl_cffi chưa trả lời sau ngưỡng percentile độ trễ,
+    # chạy song song archive.org; kết quả tốt đầu tiên thắng
+    HEDGED_FETCH = os.getenv("HEDGED_FETCH", "true").lower() == "true"
+    HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+    HEDGE_MIN_DELAY_S = float(os.getenv("HEDGE_MIN_DELAY_S", "2"))
+    HEDGE_DEFAULT_DELAY_S = float(os.getenv("HEDGE_DEFAULT_DELAY_S", "8"))
+    # Thời gian tối đa cho toàn bộ quá trình trích xuất một URL
+    CRAWL_DEADLINE_S = float(os.getenv("CRAWL_DEADLINE_S", "45"))
+    # Circuit breaker theo domain: tỉ lệ lỗi cao → ngừng gọi domain một thời
+    # gian (nhân đôi mỗi lần mở lại, tối đa CIRCUIT_MAX_OPEN_SECONDS)
+    CIRCUIT_BREAKER = os.getenv("CIRCUIT_BREAKER", "true").lower() == "true"
+    CIRCUIT_ERROR_THRESHOLD = float(os.getenv("CIRCUIT_ERROR_THRESHOLD", "0.5"))
+    CIRCUIT_MIN_REQUESTS = int(os.getenv("CIRCUIT_MIN_REQUESTS", "5"))
+    CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+    CIRCUIT_MAX_OPEN_SECONDS = float(os.getenv("CIRCUIT_MAX_OPEN_SECONDS", "600"))
+    CIRCUIT_SLOW_CALL_S = float(os.getenv("CIRCUIT_SLOW_CALL_S", "15"))
+    # Bộ lập lịch crawl dùng chung: tổng số worker, số job đồng thời và
+    # khoảng cách tối thiểu giữa hai lần bắt đầu crawl trên cùng một domain
+    CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "16"))
+    CRAWL_DOMAIN_CONCURRENCY = int(os.getenv("CRAWL_DOMAIN_CONCURRENCY", "2"))
+    CRAWL_DOMAIN_MIN_INTERVAL_S = float(os.getenv("CRAWL_DOMAIN_MIN_INTERVAL_S", "0.5"))
+    # Engine crawl: "threads" (CrawlScheduler + curl_cffi đồng bộ) hoặc
+    # "async" (một event loop với curl_cffi AsyncSession, parse trên pool CPU)
+    CRAWL_ENGINE = os.getenv("CRAWL_ENGINE", "threads").lower()
+    ASYNC_MAX_CLIENTS = int(os.getenv("ASYNC_MAX_CLIENTS", "256"))
+    PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 4)))
+    # Kho bài báo cục bộ (SQLite) + prefetch nền từ RSS/sitemap các nguồn uy tín
+    ARTICLE_STORE_ENABLED = (
+        os.getenv("ARTICLE_STORE_ENABLED", "false").lower() == "true"
+    )
+    ARTICLE_STORE_PATH = os.getenv("ARTICLE_STORE_PATH", "articles.sqlite3")
+    PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "false").lower() == "true"
+    # Danh sách feed phân tách bằng dấu phẩy (rỗng → prefetcher.DEFAULT_FEEDS)
+    PREFETCH_FEEDS = [f for f in os.getenv("PREFETCH_FEEDS", "").split(",") if f]
+    PREFETCH_INTERVAL_MINUTES = float(os.getenv("PREFETCH_INTERVAL_MINUTES", "15"))
+    PREFETCH_MAX_PER_FEED = int(os.getenv("PREFETCH_MAX_PER_FEED", "30"))
+    # Backend tìm kiếm, phân tách bằng dấu phẩy: "google" (CSE), "local"
+    # (FTS5/BM25 trên kho bài báo), "newsapi", "http" (SEARCH_HTTP_URL);
+    # "auto" = mọi backend đã cấu hình. Kết quả được gộp bằng RRF
+    SEARCH_BACKENDS = os.getenv("SEARCH_BACKENDS", "auto").lower()
+    SEARCH_HTTP_URL = os.getenv("SEARCH_HTTP_URL", None)
+    # Thời gian chờ tối đa cho mỗi backend qua mạng (quá hạn → bỏ qua kết quả)
+    SEARCH_TIMEOUT_S = float(os.getenv("SEARCH_TIMEOUT_S", "8"))
+    # Chạy các biến thể truy vấn theo nhóm (xếp theo số URL mới đã học) và
+    # dừng khi đủ URL; thống kê lưu ra file JSON nếu đặt QUERY_PLANNER_STATE_PATH
+    QUERY_PLANNER = os.getenv("QUERY_PLANNER", "true").lower() == "true"
+    QUERY_PLANNER_STATE_PATH = os.getenv("QUERY_PLANNER_STATE_PATH", None)
+    # Số biến thể chạy đồng thời mỗi nhóm khi biến thể đầu tiên (chạy một
+    # mình) chưa đủ URL, và xác suất thử một biến thể xếp hạng thấp ở vị trí
+    # đầu (để thống kê của nó không bị "đóng băng")
+    QUERY_PLANNER_WIDTH = int(os.getenv("QUERY_PLANNER_WIDTH", "2"))
+    QUERY_PLANNER_EXPLORE = float(os.getenv("QUERY_PLANNER_EXPLORE", "0.1"))
+    # Số bài tham khảo được crawl mỗi claim sau khi xếp hạng kết quả tìm kiếm
+    # theo title + snippet (bước 5 chỉ dùng top 3); 0 = crawl tất cả
+    CRAWL_TOP_K = int(os.getenv("CRAWL_TOP_K", "3"))
+    # mode="fast": verdict UNCERTAIN từ snippet thì crawl để kiểm tra đầy đủ
+    FAST_MODE_ESCALATE = os.getenv("FAST_MODE_ESCALATE", "true").lower() == "true"
+    # Gộp bài tham khảo gần trùng (SimHash 64 bit, khoảng cách Hamming tối đa)
+    NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+    NEAR_DUP_MAX_DISTANCE = int(os.getenv("NEAR_DUP_MAX_DISTANCE", "5"))
+    # Số verdict tối đa giữ trong cache kết quả (LRU)
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "2048"))
+    # Gộp các request trùng nhau đang chạy đồng thời (single-flight)
+    ENABLE_COALESCING = os.getenv("ENABLE_COALESCING", "true").lower() == "true"
 
     DEFAULT_NUM_RESULTS = int(os.getenv("DEFAULT_NUM_RESULTS", "5"))
     MAX_NUM_RESULTS = int(os.getenv("MAX_NUM_RESULTS", "10"))
@@ -37,6 +130,11 @@ class Config:
 
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
+    # Số pipeline kiểm tra chạy song song trên mỗi worker (ngoài event loop)
+    MAX_CONCURRENT_CHECKS = int(os.getenv("MAX_CONCURRENT_CHECKS", "8"))
+    # Số claim tối đa trong một request /api/check/batch
+    MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "500"))
+
     @classmethod
     def validate(cls):
         """Validate configuration và hiển thị warnings"""
@@ -60,9 +158,20 @@ class Config:
 
         print(f"\n Cache: {'ENABLED' if cls.ENABLE_CACHE else 'DISABLED'}")
         print(f" Cache TTL: {cls.CACHE_TTL_HOURS} hours")
+        print(f" Search cache backend: {cls.CACHE_BACKEND}")
+        print(f" Result cache size: {cls.RESULT_CACHE_MAX_ENTRIES} entries")
+        print(
+            f" Request coalescing: {'ENABLED' if cls.ENABLE_COALESCING else 'DISABLED'}"
+        )
         print(f" Default results: {cls.DEFAULT_NUM_RESULTS}")
         print(f" Similarity model: {cls.SIMILARITY_MODEL}")
         print(f" API Server: {cls.API_HOST}:{cls.API_PORT}")
+        print(f" Max concurrent checks: {cls.MAX_CONCURRENT_CHECKS}")
+        print(f" Crawl engine: {cls.CRAWL_ENGINE}")
+        print(f" Search backends: {cls.SEARCH_BACKENDS}")
+        print(
+            f" Article store: {cls.ARTICLE_STORE_PATH if cls.ARTICLE_STORE_ENABLED else 'DISABLED'}"
+        )
         print("=" * 70 + "\n")
 
         return True
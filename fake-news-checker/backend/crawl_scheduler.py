@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from config import Config
+from url_utils import article_key, host_key
+
+logger = logging.getLogger(__name__)
+
+
+def domain_key(url: str) -> str:
+    # www./m./amp. cùng một máy chủ thật → chung giới hạn theo domain
+    return host_key(url)
+
+
+class CrawlScheduler:
+    """
+    Bộ lập lịch crawl dùng chung toàn process.
+
+    Mỗi domain có hàng đợi riêng; job chỉ được đưa sang worker pool khi
+    domain còn slot (`per_domain` job đồng thời) và đã cách lần bắt đầu
+    trước ít nhất `min_interval` giây. Nhờ vậy worker không bao giờ bị
+    chiếm chỗ chỉ để chờ một domain đang bận.
+
+    Job cho cùng một bài (article_key của URL) với cùng hàm crawl đang chờ
+    hoặc đang chạy được gộp lại: các caller nhận chung một Future.
+    """
+
+    def __init__(self, max_workers: int, per_domain: int, min_interval: float):
+        self.per_domain = per_domain
+        self.min_interval = min_interval
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="crawl"
+        )
+        self._cond = threading.Condition()
+        self._queues: Dict[str, deque] = {}
+        self._active: Dict[str, int] = {}
+        self._next_start: Dict[str, float] = {}
+        self._jobs: Dict[tuple, Future] = {}
+        self._closed = False
+        self.submitted = 0
+        self.merged = 0
+        self.completed = 0
+        self.failed = 0
+        self._dispatcher = threading.Thread(
+            target=self._dispatch_loop, name="crawl-dispatcher", daemon=True
+        )
+        self._dispatcher.start()
+        logger.info(
+            f"Crawl scheduler: {max_workers} workers, {per_domain} per domain, "
+            f"{min_interval}s spacing"
+        )
+
+    def submit(self, url: str, fn: Callable, *args, **kwargs) -> Future:
+        """Xếp job crawl `fn(*args, **kwargs)` cho `url`, trả về Future."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Crawl scheduler is shut down")
+            # Hàm khác nhau trả kết quả khác nhau (vd. prefetch chỉ lấy bài thô)
+            key = (article_key(url), fn)
+            future = self._jobs.get(key)
+            if future is not None:
+                self.merged += 1
+                return future
+            future = Future()
+            self._jobs[key] = future
+            domain = domain_key(url)
+            self._queues.setdefault(domain, deque()).append(
+                (key, fn, args, kwargs, future)
+            )
+            self.submitted += 1
+            self._cond.notify()
+            return future
+
+    def _dispatch_loop(self):
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                wait_for: Optional[float] = None
+                for domain, queue in self._queues.items():
+                    if not queue or self._active.get(domain, 0) >= self.per_domain:
+                        continue
+                    next_start = self._next_start.get(domain, 0.0)
+                    if now < next_start:
+                        delay = next_start - now
+                        wait_for = delay if wait_for is None else min(wait_for, delay)
+                        continue
+                    job = queue.popleft()
+                    self._active[domain] = self._active.get(domain, 0) + 1
+                    self._next_start[domain] = now + self.min_interval
+                    self._pool.submit(self._run, domain, *job)
+                    if queue:
+                        # Còn job cùng domain: xét lại sau khoảng cách tối thiểu
+                        delay = self.min_interval
+                        wait_for = delay if wait_for is None else min(wait_for, delay)
+                # Dọn hàng đợi rỗng để dict không phình theo số domain
+                for domain in [d for d, q in self._queues.items() if not q]:
+                    del self._queues[domain]
+                self._cond.wait(timeout=wait_for)
+
+    def _run(self, domain, key, fn, args, kwargs, future):
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            with self._cond:
+                self._active[domain] -= 1
+                if not self._active[domain]:
+                    del self._active[domain]
+                self._jobs.pop(key, None)
+                if future.cancelled() or future.exception() is not None:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+                self._cond.notify()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "per_domain": self.per_domain,
+                "min_interval_s": self.min_interval,
+                "queued": {d: len(q) for d, q in self._queues.items() if q},
+                "active": dict(self._active),
+                "submitted": self.submitted,
+                "merged": self.merged,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            # Hủy mọi job chưa chạy: cả job còn trong hàng đợi lẫn job đã đưa
+            # sang pool nhưng bị cancel_futures bỏ đi, để caller đang chờ
+            # .result() nhận CancelledError thay vì treo mãi. Job đang chạy
+            # không hủy được và sẽ tự trả kết quả.
+            for future in self._jobs.values():
+                future.cancel()
+            self._queues.clear()
+            self._cond.notify()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_scheduler: Optional[CrawlScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_crawl_scheduler() -> CrawlScheduler:
+    """Scheduler dùng chung toàn process, tạo lười ở lần dùng đầu tiên."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = CrawlScheduler(
+                    max_workers=Config.CRAWL_WORKERS,
+                    per_domain=Config.CRAWL_DOMAIN_CONCURRENCY,
+                    min_interval=Config.CRAWL_DOMAIN_MIN_INTERVAL_S,
+                )
+    return _scheduler
+
+
+def shutdown_crawl_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.shutdown()
+            _scheduler = None
@@ -1,26 +1,243 @@
 import logging
 import random
 import re
+import threading
 import time
 import unicodedata
-from collections import Counter
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 from urllib.parse import quote_plus, urljoin, urlparse
 
-import requests
-from bs4 import BeautifulSoup
-from curl_cffi import requests as cffi_requests
+from article_cache import ArticleCache
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from config import Config
+from html_parser import match_class, parse_html, resolve_backend
+from http_pool import get_cffi_session, get_requests_session, host_slot
+from negative_cache import NegativeCache
 
 # Import hàm chuẩn hóa từ file chúng ta vừa tạo
 from text_utils import normalize_text
+from url_utils import article_key, host_key
 
 logger = logging.getLogger(__name__)
 
+# Class của các div thường chứa nội dung bài báo
+CONTENT_CLASS_RE = re.compile(r"(content|article|body|detail|story|entry|post)", re.I)
+
+
+@lru_cache(maxsize=4096)
+def _is_content_class(class_value):
+    # Các trang báo lặp lại cùng một tập class → cache kết quả regex
+    return match_class(class_value, CONTENT_CLASS_RE)
+
+
+# Container nội dung riêng của từng trang báo uy tín
+DOMAIN_CONTAINERS = {
+    "vnexpress.net": {
+        "label": "VnExpress",
+        "tags": ("article", "div"),
+        "class_": "fck_detail",
+    },
+    "tuoitre.vn": {
+        "label": "Tuổi Trẻ",
+        "tags": ("div",),
+        "id": "main-detail-content",
+    },
+    "thanhnien.vn": {
+        "label": "Thanh Niên",
+        "tags": ("div",),
+        "class_": re.compile("content|detail|body", re.I),
+    },
+    "dantri.com.vn": {
+        "label": "Dân Trí",
+        "tags": ("div",),
+        "class_": re.compile("detail|content", re.I),
+    },
+    "vietnamnet.vn": {
+        "label": "VietnamNet",
+        "tags": ("div",),
+        "class_": re.compile("main-content|article-content", re.I),
+    },
+}
+
+
+# Đọc stream theo domain: "max_kb" là ngân sách byte riêng (mặc định
+# Config.CRAWL_MAX_KB). Khi đã gặp marker "start" (container thân bài), chỉ cần
+# gặp một marker kết thúc (khối bình luận / tin liên quan) là ngừng đọc.
+# Domain không có "start" chỉ bị giới hạn bởi ngân sách byte.
+STREAM_END_MARKERS = (
+    b'id="box_comment',
+    b'class="box_comment',
+    b'class="box-comment',
+    b'id="comment-box',
+    b'class="comment-box',
+)
+
+STREAM_RULES = {
+    "vnexpress.net": {
+        "max_kb": 1536,
+        "start": b'class="fck_detail',
+        "end": STREAM_END_MARKERS + (b'id="box_tinkhac', b'class="box-tinlienquanv2'),
+    },
+    "tuoitre.vn": {
+        "max_kb": 2048,
+        "start": b'id="main-detail-content"',
+        "end": STREAM_END_MARKERS + (b'class="detail-tab', b'id="comment-'),
+    },
+}
+
+
+# Status cho thấy domain đang chặn / quá tải (404 là lỗi của riêng URL)
+DOMAIN_FAILURE_STATUSES = {403, 429, 500, 502, 503, 504}
+
+
+class FetchedPage:
+    """Response đã đọc (có thể bị cắt sớm khi đọc stream)."""
+
+    def __init__(self, status_code, headers, content: bytes, truncated=False):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.truncated = truncated
+
+
+class StreamReader:
+    """
+    Gom body theo từng chunk. feed() trả về True khi nên ngừng đọc: đã vượt
+    ngân sách byte của domain, hoặc đã vào thân bài và gặp marker kết thúc
+    (phần còn lại thường là bình luận, tin liên quan, JSON nhúng - không cần
+    cho trích xuất). Dùng chung cho fetch đồng bộ và async.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        domain = urlparse(url).netloc
+        rule = next((rule for key, rule in STREAM_RULES.items() if key in domain), {})
+        self.max_bytes = rule.get("max_kb", Config.CRAWL_MAX_KB) * 1024
+        self.start_marker = rule.get("start")
+        self.end_markers = rule.get("end", ())
+        self.overlap = max(
+            (len(m) for m in (self.start_marker, *self.end_markers) if m), default=1
+        )
+        self.buffer = bytearray()
+        self.body_from = None  # vị trí bắt đầu thân bài (sau marker "start")
+        self.cut = None
+
+    def feed(self, chunk: bytes) -> bool:
+        buffer = self.buffer
+        scan_from = max(0, len(buffer) - self.overlap + 1)
+        buffer += chunk
+
+        if self.start_marker and self.body_from is None:
+            pos = buffer.find(self.start_marker, scan_from)
+            if pos != -1:
+                self.body_from = pos + len(self.start_marker)
+        if self.body_from is not None:
+            search_from = max(scan_from, self.body_from)
+            cut = min(
+                (
+                    p
+                    for p in (buffer.find(m, search_from) for m in self.end_markers)
+                    if p != -1
+                ),
+                default=-1,
+            )
+            if cut != -1:
+                logger.info(
+                    f"Stream cut-off at end marker: {cut // 1024}KB read ({self.url})"
+                )
+                self.cut = cut
+                return True
+
+        if len(buffer) >= self.max_bytes:
+            logger.warning(
+                f"Stream byte budget reached ({self.max_bytes // 1024}KB): {self.url}"
+            )
+            self.cut = self.max_bytes
+            return True
+        return False
+
+    def result(self) -> Tuple[bytes, bool]:
+        """(nội dung, bị cắt sớm hay không)."""
+        if self.cut is None:
+            return bytes(self.buffer), False
+        return bytes(self.buffer[: self.cut]), True
+
+
+class LatencyTracker:
+    """Ring buffer độ trễ các lần fetch curl_cffi thành công (tính percentile)."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.min_samples = min_samples
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """None khi chưa đủ mẫu để ước lượng."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def _remaining(deadline, cap):
+    """Timeout cho một thao tác: không vượt quá `cap` và hạn chót còn lại."""
+    if deadline is None:
+        return cap
+    return max(0.0, min(cap, deadline - time.monotonic()))
+
 
 class Crawler:
 
-    def __init__(self):
-        logger.info("Crawler initialized")
+    def __init__(self, parser_backend=None):
+        # Parser HTML: "bs4" (html.parser, mặc định) hoặc "lxml" (C, nhanh hơn)
+        self.parser_backend = resolve_backend(parser_backend or Config.HTML_PARSER)
+        # Cache nội dung bài báo theo URL (revalidate bằng ETag/Last-Modified)
+        self.article_cache = (
+            ArticleCache(
+                ttl_hours=Config.ARTICLE_CACHE_TTL_HOURS,
+                max_entries=Config.ARTICLE_CACHE_MAX_ENTRIES,
+            )
+            if Config.ENABLE_CACHE
+            else None
+        )
+        # URL đã thất bại ở mọi phương pháp: bỏ qua ngay trong một thời gian ngắn
+        self.failed_urls = (
+            NegativeCache(ttl_seconds=Config.CRAWL_NEGATIVE_TTL_MINUTES * 60)
+            if Config.ENABLE_CACHE and Config.CRAWL_NEGATIVE_TTL_MINUTES > 0
+            else None
+        )
+        # Sức khỏe từng domain: domain lỗi liên tục → bỏ qua, dùng cache/archive
+        self.circuit_breaker = (
+            CircuitBreaker(
+                min_requests=Config.CIRCUIT_MIN_REQUESTS,
+                error_threshold=Config.CIRCUIT_ERROR_THRESHOLD,
+                open_seconds=Config.CIRCUIT_OPEN_SECONDS,
+                max_open_seconds=Config.CIRCUIT_MAX_OPEN_SECONDS,
+                slow_call_seconds=Config.CIRCUIT_SLOW_CALL_S,
+            )
+            if Config.CIRCUIT_BREAKER
+            else None
+        )
+        # Độ trễ của fetch chính → ngưỡng để bắt đầu hedge sang archive.org
+        self.latency = LatencyTracker()
+        # Mỗi worker crawl cần tối đa 2 slot (fetch chính + hedge): đủ chỗ để
+        # hedge chạy song song thật, không phải xếp hàng sau các fetch chính
+        self._hedge_pool = ThreadPoolExecutor(
+            max_workers=2 * Config.CRAWL_WORKERS, thread_name_prefix="crawl-hedge"
+        )
+        self._stats_lock = threading.Lock()
+        self.hedges_started = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+        logger.info(f"Crawler initialized (HTML parser: {self.parser_backend})")
         # Bạn có thể khởi tạo AsyncSession ở đây nếu dùng cho Giai đoạn 2
 
     def is_valid_article_url(self, url):
@@ -54,25 +271,181 @@ class Crawler:
         if not self.is_valid_article_url(url):
             logger.warning(f"URL may not be a valid article: {url}")
 
-        result = self._try_requests_method(url)
-        if result:
-            return result
-
-        logger.warning("Method 1 failed, trying archive.org proxy...")
-        result = self._try_archive_method(url)
+        article, cached = self._from_cache(url)
+        if article:
+            return article
+        if self._known_failure(url):
+            return None
+        if cached:
+            result = self._revalidate(url, cached)
+            if result:
+                return result
+
+        deadline = time.monotonic() + Config.CRAWL_DEADLINE_S
+        if Config.HEDGED_FETCH:
+            result, sent = self._extract_hedged(url, deadline)
+        else:
+            result, sent = self._extract_sequential(url, deadline), True
         if result:
             return result
+        if not sent:
+            # Fetch chính chưa từng chạy (pool bận): không phải lỗi của URL,
+            # không ghi vào negative cache
+            logger.warning(f"No request sent before deadline, not caching: {url}")
+
+        if time.monotonic() >= deadline:
+            self._count("deadline_exceeded")
+            logger.error(f"Extraction deadline exceeded for {url}")
+            if sent:
+                self._remember_failure(url)
+            return None
 
         logger.warning("Method 2 failed, trying search snippet extraction...")
-        result = self._try_search_snippet_method(url)
+        result = self._try_search_snippet_method(url, deadline=deadline)
         if result:
             return result
 
         logger.error("All extraction methods failed")
+        if sent:
+            self._remember_failure(url)
         return None
 
-    def _try_requests_method(self, url, max_retries=3):
+    def fetch_direct(self, url, max_retries=1):
+        """
+        Chỉ fetch trực tiếp (không archive.org / snippet), dùng cho crawl nền:
+        vẫn qua cache bài báo và circuit breaker của domain.
+        """
+        article, _ = self._from_cache(url)
+        if article:
+            return article
+        return self._try_requests_method(url, max_retries=max_retries)
+
+    def _known_failure(self, url):
+        if self.failed_urls and self.failed_urls.contains(article_key(url)):
+            logger.info(f"Skipping recently failed URL (negative cache): {url}")
+            return True
+        return False
+
+    def _remember_failure(self, url):
+        if self.failed_urls is None:
+            return
+        domain = host_key(url)
+        if self.circuit_breaker and self.circuit_breaker.is_open(domain):
+            # Lỗi do cả domain đang ngắt mạch: circuit breaker đã lo phần này
+            return
+        self.failed_urls.add(article_key(url))
+
+    def _from_cache(self, url):
+        """
+        Trả về (bài dùng được ngay, entry cache cần revalidate). Bài dùng được
+        ngay khi cache còn hạn, hoặc đã stale nhưng domain đang bị ngắt mạch.
+        """
+        cached = self.article_cache.lookup(url) if self.article_cache else None
+        if cached is None:
+            return None, None
+        if cached.fresh:
+            logger.info(f"Article cache HIT: {url}")
+            return cached.article, cached
+        domain = host_key(url)
+        if self.circuit_breaker and self.circuit_breaker.is_open(domain):
+            # Domain đang lỗi: dùng bản cache cũ thay vì revalidate
+            logger.info(f"Circuit open for {domain}, serving stale cache: {url}")
+            return cached.article, cached
+        return None, cached
+
+    def _extract_sequential(self, url, deadline):
+        result = self._try_requests_method(url, deadline=deadline)
+        if result:
+            return result
+
+        logger.warning("Method 1 failed, trying archive.org proxy...")
+        result = self._try_archive_method(url, deadline=deadline)
+        if result and self.article_cache:
+            self.article_cache.set(url, result)
+        return result
+
+    def _extract_hedged(self, url, deadline):
+        """
+        Chạy curl_cffi; nếu chưa xong sau ngưỡng p95 độ trễ (hoặc đã thất bại)
+        thì chạy song song archive.org. Kết quả tốt đầu tiên thắng, nhánh còn
+        lại bị hủy qua `cancel` (được kiểm tra giữa các lần retry / sleep).
+        Trả về (bài báo hoặc None, fetch chính đã thực sự được chạy hay chưa).
+        """
+        cancel = threading.Event()
+        hedge_at = time.monotonic() + self._hedge_delay()
+        primary = self._hedge_pool.submit(
+            self._try_requests_method, url, cancel=cancel, deadline=deadline
+        )
+        pending = {primary}
+        hedge = None
+        winner = None
+        try:
+            while pending and winner is None:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                timeout = deadline - now
+                if hedge is None:
+                    timeout = min(timeout, max(0.0, hedge_at - now))
+                done, pending = wait(
+                    pending, timeout=timeout, return_when=FIRST_COMPLETED
+                )
+
+                for future in done:
+                    result = future.result()
+                    if result:
+                        if future is hedge:
+                            self._count("hedge_wins")
+                            logger.info(f"Hedged archive.org fetch won for {url}")
+                            if self.article_cache:
+                                self.article_cache.set(url, result)
+                        winner = result
+                        break
+
+                # Hết ngưỡng chờ hoặc fetch chính đã thất bại → bắt đầu hedge
+                if winner is None and hedge is None:
+                    if primary in done:
+                        logger.warning("Method 1 failed, trying archive.org proxy...")
+                    else:
+                        self._count("hedges_started")
+                        logger.info(
+                            f"Primary fetch slow (> {self._hedge_delay():.1f}s), "
+                            f"hedging with archive.org: {url}"
+                        )
+                    hedge = self._hedge_pool.submit(
+                        self._try_archive_method, url, cancel=cancel, deadline=deadline
+                    )
+                    pending.add(hedge)
+        finally:
+            cancel.set()
+        # cancel() chỉ thành công khi fetch chính còn nằm trong hàng đợi của
+        # pool, tức là chưa có request nào tới URL được gửi đi
+        return winner, not primary.cancel()
+
+    def _hedge_delay(self):
+        p = self.latency.percentile(Config.HEDGE_PERCENTILE)
+        if p is None:
+            return Config.HEDGE_DEFAULT_DELAY_S
+        return max(Config.HEDGE_MIN_DELAY_S, p)
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def hedge_stats(self) -> Dict:
+        p = self.latency.percentile(Config.HEDGE_PERCENTILE)
+        with self._stats_lock:
+            return {
+                "enabled": Config.HEDGED_FETCH,
+                "hedge_delay_s": round(self._hedge_delay(), 3),
+                "primary_latency_p": round(p, 3) if p is not None else None,
+                "hedges_started": self.hedges_started,
+                "hedge_wins": self.hedge_wins,
+                "deadline_exceeded": self.deadline_exceeded,
+                "deadline_s": Config.CRAWL_DEADLINE_S,
+            }
 
+    def _build_headers(self, url):
         user_agents = [
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -80,127 +453,221 @@ class Crawler:
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
         ]
 
+        headers = {
+            "User-Agent": random.choice(user_agents),
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "vi-VN,vi;q=0.9,en-US;q=0.8,en;q=0.7",
+        }
+
+        domain = urlparse(url).netloc
+        if "vnexpress.net" in domain:
+            headers["Referer"] = "https://www.google.com/search?q=vnexpress"
+        return headers
+
+    def _fetch(self, url, headers, timeout=30):
+        if not self.circuit_breaker:
+            return self._fetch_page(url, headers, timeout)
+
+        domain = host_key(url)
+        if not self.circuit_breaker.allow(domain):
+            raise CircuitOpenError(domain, self.circuit_breaker.retry_in(domain))
+        started = time.monotonic()
+        try:
+            page = self._fetch_page(url, headers, timeout)
+        except Exception:
+            self._record_outcome(domain, None, time.monotonic() - started)
+            raise
+        self._record_outcome(domain, page.status_code, time.monotonic() - started)
+        return page
+
+    def _record_outcome(self, domain, status_code, latency):
+        """Ghi kết quả fetch vào circuit breaker (status None = lỗi kết nối)."""
+        if not self.circuit_breaker:
+            return
+        if status_code is None or status_code in DOMAIN_FAILURE_STATUSES:
+            self.circuit_breaker.record_failure(domain, latency)
+        else:
+            self.circuit_breaker.record_success(domain, latency)
+
+    def _fetch_page(self, url, headers, timeout):
+        with host_slot(url):
+            response = get_cffi_session().get(
+                url,
+                headers=headers,
+                timeout=timeout,
+                allow_redirects=True,
+                verify=True,
+                impersonate="chrome120",
+                stream=Config.STREAM_FETCH,
+            )
+            if not Config.STREAM_FETCH:
+                return FetchedPage(
+                    response.status_code, response.headers, response.content
+                )
+            try:
+                content, truncated = b"", False
+                if response.status_code == 200:
+                    content, truncated = self._read_stream(response, url)
+                return FetchedPage(
+                    response.status_code, response.headers, content, truncated
+                )
+            finally:
+                response.close()
+
+    def _read_stream(self, response, url) -> Tuple[bytes, bool]:
+        reader = StreamReader(url)
+        for chunk in response.iter_content(chunk_size=16384):
+            if reader.feed(chunk):
+                break
+        return reader.result()
+
+    def _revalidate(self, url, cached):
+        """
+        Conditional GET cho bài đã hết TTL trong cache.
+        304 → dùng lại nội dung cũ (không tải lại, không parse lại).
+        """
+        validators = cached.conditional_headers()
+        if not validators:
+            return None
+        try:
+            headers = self._build_headers(url)
+            headers.update(validators)
+            response = self._fetch(url, headers)
+            if response.status_code == 304:
+                logger.info(f"Article not modified (304): {url}")
+                self.article_cache.touch(url)
+                return cached.article
+            if response.status_code == 200:
+                result = self._parse_article(response.content, url)
+                if result:
+                    self._cache_response(url, result, response)
+                    return result
+        except Exception as e:
+            logger.warning(f"Revalidation failed for {url}: {str(e)}")
+        return None
+
+    def _cache_response(self, url, result, response):
+        if self.article_cache:
+            self.article_cache.set(
+                url,
+                result,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+
+    def _parse_article(self, html, url):
+        """Parse HTML và trích xuất bài báo. Trả về None nếu nội dung quá ngắn."""
+        doc = parse_html(html, self.parser_backend)
+
+        for tag in doc.find_all(
+            [
+                "script",
+                "style",
+                "iframe",
+                "noscript",
+                "nav",
+                "footer",
+                "header",
+            ]
+        ):
+            tag.decompose()
+
+        title = self._extract_title(doc)
+        description = self._extract_description(doc)
+        content = self._extract_content(doc, url)
+
+        if content and len(content) > 100:
+            return {
+                # THAY ĐỔI: Sử dụng hàm normalize_text được import
+                "title": normalize_text(title),
+                "description": normalize_text(description),
+                "content": normalize_text(content),
+                "url": url,
+                "domain": urlparse(url).netloc,
+            }
+        return None
+
+    def _try_requests_method(self, url, max_retries=3, cancel=None, deadline=None):
+
         for attempt in range(max_retries):
+            if cancel is not None and cancel.is_set():
+                return None
+            timeout = _remaining(deadline, 30)
+            if timeout <= 0:
+                logger.warning(f"Deadline reached before attempt {attempt + 1}")
+                return None
             try:
                 logger.info(
                     f"Attempt {attempt + 1}/{max_retries}: Extracting from {url} using curl_cffi"
                 )
 
-                headers = {
-                    "User-Agent": random.choice(user_agents),
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                    "Accept-Language": "vi-VN,vi;q=0.9,en-US;q=0.8,en;q=0.7",
-                }
-
-                domain = urlparse(url).netloc
-                if "vnexpress.net" in domain:
-                    headers["Referer"] = "https://www.google.com/search?q=vnexpress"
-
-                response = cffi_requests.get(
-                    url,
-                    headers=headers,
-                    timeout=30,
-                    allow_redirects=True,
-                    verify=True,
-                    impersonate="chrome120",
-                )
+                started = time.monotonic()
+                response = self._fetch(url, self._build_headers(url), timeout=timeout)
 
                 if response.status_code == 200:
-                    soup = BeautifulSoup(response.content, "html.parser")
-
-                    for tag in soup(
-                        [
-                            "script",
-                            "style",
-                            "iframe",
-                            "noscript",
-                            "nav",
-                            "footer",
-                            "header",
-                        ]
-                    ):
-                        tag.decompose()
-
-                    title = self._extract_title(soup)
-                    description = self._extract_description(soup)
-                    content = self._extract_content(soup, url)
-
-                    if content and len(content) > 100:
+                    self.latency.record(time.monotonic() - started)
+                    result = self._parse_article(response.content, url)
+                    if result:
                         logger.info(
-                            f"Successfully extracted {len(content)} characters (via curl_cffi)"
+                            f"Successfully extracted {len(result['content'])} characters (via curl_cffi)"
                         )
-                        return {
-                            # THAY ĐỔI: Sử dụng hàm normalize_text được import
-                            "title": normalize_text(title),
-                            "description": normalize_text(description),
-                            "content": normalize_text(content),
-                            "url": url,
-                            "domain": domain,
-                        }
+                        self._cache_response(url, result, response)
+                        return result
 
                 logger.warning(
                     f"Attempt {attempt + 1} failed: Status {response.status_code}"
                 )
 
+            except CircuitOpenError as e:
+                logger.warning(f"Skipping curl_cffi: {str(e)}")
+                return None
             except Exception as e:
                 logger.warning(f"Attempt {attempt + 1} failed: {str(e)}")
 
             if attempt < max_retries - 1:
-                time.sleep(random.uniform(2, 5))
+                delay = _remaining(deadline, random.uniform(2, 5))
+                if cancel is not None:
+                    # Dừng ngay nếu nhánh khác đã thắng trong lúc chờ
+                    if cancel.wait(delay):
+                        return None
+                else:
+                    time.sleep(delay)
 
         return None
 
-    def _try_archive_method(self, url):
+    def _try_archive_method(self, url, cancel=None, deadline=None):
+        if _remaining(deadline, 10) <= 0:
+            return None
 
         try:
 
             archive_api = f"http://archive.org/wayback/available?url={url}"
-            response = requests.get(archive_api, timeout=10)
+            session = get_requests_session()
+            response = session.get(archive_api, timeout=_remaining(deadline, 10))
             data = response.json()
 
             if "archived_snapshots" in data and "closest" in data["archived_snapshots"]:
                 archive_url = data["archived_snapshots"]["closest"]["url"]
                 logger.info(f"Found archive.org snapshot: {archive_url}")
+                if cancel is not None and cancel.is_set():
+                    return None
 
-                archive_response = requests.get(archive_url, timeout=30)
+                archive_response = session.get(
+                    archive_url, timeout=_remaining(deadline, 30)
+                )
                 if archive_response.status_code == 200:
-                    soup = BeautifulSoup(archive_response.content, "html.parser")
-
-                    for tag in soup(
-                        [
-                            "script",
-                            "style",
-                            "iframe",
-                            "noscript",
-                            "nav",
-                            "footer",
-                            "header",
-                        ]
-                    ):
-                        tag.decompose()
-
-                    title = self._extract_title(soup)
-                    description = self._extract_description(soup)
-                    content = self._extract_content(soup, url)
-
-                    if content and len(content) > 100:
+                    result = self._parse_article(archive_response.content, url)
+                    if result:
                         logger.info(
-                            f"Archive.org extraction successful: {len(content)} chars"
+                            f"Archive.org extraction successful: {len(result['content'])} chars"
                         )
-                        return {
-                            # THAY ĐỔI: Sử dụng hàm normalize_text được import
-                            "title": normalize_text(title),
-                            "description": normalize_text(description),
-                            "content": normalize_text(content),
-                            "url": url,
-                            "domain": urlparse(url).netloc,
-                        }
+                        return result
         except Exception as e:
             logger.warning(f"Archive.org method failed: {str(e)}")
 
         return None
 
-    def _try_search_snippet_method(self, url):
+    def _try_search_snippet_method(self, url, deadline=None):
         try:
             search_query = (
                 f"site:{urlparse(url).netloc} {url.split('/')[-1].replace('-', ' ')}"
@@ -211,13 +678,15 @@ class Crawler:
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
             }
 
-            response = requests.get(search_url, headers=headers, timeout=10)
-            soup = BeautifulSoup(response.content, "html.parser")
+            response = get_requests_session().get(
+                search_url, headers=headers, timeout=_remaining(deadline, 10)
+            )
+            doc = parse_html(response.content, self.parser_backend)
 
-            search_divs = soup.find_all("div", class_="g")
+            search_divs = doc.find_all("div", class_="g")
             for div in search_divs:
-                link = div.find("a", href=True)
-                if link and url in link["href"]:
+                link = div.find("a", attrs={"href": True})
+                if link and url in link.get("href"):
                     title_elem = div.find("h3")
                     title = title_elem.get_text(strip=True) if title_elem else ""
 
@@ -241,55 +710,110 @@ class Crawler:
 
         return None
 
-    def _extract_title(self, soup):
+    def _extract_title(self, doc):
         title = ""
-        title_tag = soup.find("title")
+        title_tag = doc.find("title")
         if title_tag:
             title = title_tag.get_text().strip()
 
         if not title:
-            h1 = soup.find("h1")
+            h1 = doc.find("h1")
             if h1:
                 title = h1.get_text().strip()
 
         if not title:
-            meta_title = soup.find("meta", property="og:title")
-            if meta_title and meta_title.has_attr("content"):
-                title = meta_title["content"].strip()
+            meta_title = doc.find("meta", attrs={"property": "og:title"})
+            if meta_title and meta_title.get("content") is not None:
+                title = meta_title.get("content").strip()
 
         return title
 
-    def _extract_description(self, soup):
+    def _extract_description(self, doc):
         description = ""
-        meta_desc = soup.find("meta", attrs={"name": "description"})
+        meta_desc = doc.find("meta", attrs={"name": "description"})
         if not meta_desc:
-            meta_desc = soup.find("meta", attrs={"property": "og:description"})
+            meta_desc = doc.find("meta", attrs={"property": "og:description"})
 
-        if meta_desc and meta_desc.has_attr("content"):
-            description = meta_desc["content"].strip()
+        if meta_desc and meta_desc.get("content") is not None:
+            description = meta_desc.get("content").strip()
 
         return description
 
-    def _extract_content(self, soup, url):
-        content = ""
+    def _extract_content(self, doc, url):
+        """
+        Trích xuất nội dung chính với MỘT lần duyệt DOM.
+
+        Các <p> nằm trong một container luôn liên tiếp nhau theo thứ tự tài
+        liệu, nên lần duyệt duy nhất chỉ cần ghi lại khoảng [đầu, cuối) trong
+        danh sách <p> cho mỗi container ứng viên (<article>, các div có class
+        dạng content, container riêng của từng trang). Text của mỗi <p> chỉ
+        được tính tối đa một lần (lazy), nên container lồng nhau không còn gây
+        chi phí bình phương. Thứ tự ưu tiên giữ nguyên:
+        <article> → content div → theo domain → toàn bộ <p>.
+        """
         domain = urlparse(url).netloc
+        rule = next(
+            (rule for key, rule in DOMAIN_CONTAINERS.items() if key in domain), None
+        )
 
-        article = soup.find("article")
+        article = None
+        content_divs = []
+        domain_container = None
+        spans = {}  # node.key -> [chỉ số <p> đầu tiên, chỉ số sau <p> cuối]
+        paragraphs = []
+
+        for event, tag, node in doc.iter_events(
+            start_tags=("article", "div", "p"), end_tags=("article", "div")
+        ):
+            if tag == "p":
+                paragraphs.append(node)
+                continue
+            if event == "end":
+                span = spans.get(node.key)
+                if span is not None:
+                    span[1] = len(paragraphs)
+                continue
+
+            is_container = False
+            class_value = node.get("class")
+            if tag == "article" and article is None:
+                article = node
+                is_container = True
+            if tag == "div" and _is_content_class(class_value):
+                content_divs.append(node)
+                is_container = True
+            if (
+                domain_container is None
+                and rule
+                and self._match_rule(node, tag, class_value, rule)
+            ):
+                domain_container = node
+                is_container = True
+            if is_container:
+                spans[node.key] = [len(paragraphs), len(paragraphs)]
+
+        texts = [None] * len(paragraphs)
+
+        def paragraph_text(idx):
+            if texts[idx] is None:
+                text = paragraphs[idx].get_text().strip()
+                texts[idx] = text if len(text) > 30 else ""
+            return texts[idx]
+
+        def container_text(node):
+            start, end = spans[node.key]
+            return " ".join(t for t in map(paragraph_text, range(start, end)) if t)
+
+        content = ""
         if article:
-            content = self._extract_paragraphs(article)
+            content = container_text(article)
             if len(content) > 200:
                 logger.info(f"Content found in <article> tag: {len(content)} chars")
                 return content
 
         if not content or len(content) < 200:
-            content_divs = soup.find_all(
-                "div",
-                class_=re.compile(
-                    r"(content|article|body|detail|story|entry|post)", re.I
-                ),
-            )
             for div in content_divs:
-                temp_content = self._extract_paragraphs(div)
+                temp_content = container_text(div)
                 if len(temp_content) > len(content):
                     content = temp_content
                     if len(content) > 500:
@@ -299,59 +823,27 @@ class Crawler:
                         break
 
         if not content or len(content) < 200:
-            content = self._extract_domain_specific(soup, domain)
+            content = ""
+            if domain_container:
+                content = container_text(domain_container)
+                logger.info(f"{rule['label']} content: {len(content)} chars")
 
         if not content or len(content) < 200:
-            paragraphs = soup.find_all("p")
-            texts = [
-                p.get_text().strip()
-                for p in paragraphs
-                if len(p.get_text().strip()) > 30
-            ]
-            content = " ".join(texts[:50])
+            fallback = []
+            for idx in range(len(paragraphs)):
+                text = paragraph_text(idx)
+                if text:
+                    fallback.append(text)
+                    if len(fallback) == 50:
+                        break
+            content = " ".join(fallback)
             logger.info(f"Fallback extraction: {len(content)} chars")
 
         return content
 
-    def _extract_paragraphs(self, element):
-        paragraphs = element.find_all("p")
-        texts = [
-            p.get_text().strip() for p in paragraphs if len(p.get_text().strip()) > 30
-        ]
-        return " ".join(texts)
-
-    def _extract_domain_specific(self, soup, domain):
-        content = ""
-
-        if "vnexpress.net" in domain:
-            vnexpress = soup.find(["article", "div"], class_="fck_detail")
-            if vnexpress:
-                content = self._extract_paragraphs(vnexpress)
-                logger.info(f"VnExpress content: {len(content)} chars")
-
-        elif "tuoitre.vn" in domain:
-            tuoitre = soup.find("div", id="main-detail-content")
-            if tuoitre:
-                content = self._extract_paragraphs(tuoitre)
-                logger.info(f"Tuổi Trẻ content: {len(content)} chars")
-
-        elif "thanhnien.vn" in domain:
-            thanhnien = soup.find("div", class_=re.compile("content|detail|body", re.I))
-            if thanhnien:
-                content = self._extract_paragraphs(thanhnien)
-                logger.info(f"Thanh Niên content: {len(content)} chars")
-
-        elif "dantri.com.vn" in domain:
-            dantri = soup.find("div", class_=re.compile("detail|content", re.I))
-            if dantri:
-                content = self._extract_paragraphs(dantri)
-                logger.info(f"Dân Trí content: {len(content)} chars")
-        elif "vietnamnet.vn" in domain:
-            vietnamnet = soup.find(
-                "div", class_=re.compile("main-content|article-content", re.I)
-            )
-            if vietnamnet:
-                content = self._extract_paragraphs(vietnamnet)
-                logger.info(f"VietnamNet content: {len(content)} chars")
-
-        return content
+    def _match_rule(self, node, tag, class_value, rule):
+        if tag not in rule["tags"]:
+            return False
+        if rule.get("id") is not None and node.get("id") != rule["id"]:
+            return False
+        return match_class(class_value, rule.get("class_"))
@@ -0,0 +1,287 @@
+"""
+Lớp trừu tượng cho HTML parser của Crawler.
+
+Các hàm _extract_* chỉ dùng một tập nhỏ API (giống BeautifulSoup):
+find / find_all / get / get_text / decompose / parent (+ key và
+iter_events để lập chỉ mục trong một lần duyệt). Có hai backend:
+
+- "bs4":  BeautifulSoup + html.parser thuần Python (mặc định, cho kết quả
+          giống hệt bộ trích xuất cũ)
+- "lxml": parser C (libxml2), nhanh hơn nhiều trên các trang 300-800KB,
+          nhưng sửa HTML lỗi khác html.parser (<p> lồng nhau, thẻ khối
+          trong <p>), xem bench_parsers.py
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Union
+
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+
+try:
+    from lxml import etree
+
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+TagNames = Union[str, List[str], None]
+ClassMatcher = Union[str, re.Pattern, None]
+
+_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.I)
+_XML_DECL_RE = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+
+def match_class(class_value: Optional[str], matcher: ClassMatcher) -> bool:
+    # Giống BeautifulSoup: khớp nếu cả chuỗi class hoặc một class bất kỳ khớp
+    if matcher is None:
+        return True
+    if not class_value:
+        return False
+    if isinstance(matcher, re.Pattern):
+        if matcher.search(class_value):
+            return True
+        return " " in class_value and any(
+            matcher.search(c) for c in class_value.split()
+        )
+    return matcher == class_value or matcher in class_value.split()
+
+
+def _match_attrs(get, attrs: Optional[Dict]) -> bool:
+    if not attrs:
+        return True
+    for name, expected in attrs.items():
+        value = get(name)
+        if expected is True:
+            if value is None:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+class HTMLNode:
+    """Interface chung cho một phần tử HTML (hoặc cả tài liệu)."""
+
+    tag: str = ""
+
+    def find(self, name: TagNames = None, class_=None, id=None, attrs=None):
+        for node in self.iter_find(name, class_, id, attrs):
+            return node
+        return None
+
+    def find_all(self, name: TagNames = None, class_=None, id=None, attrs=None):
+        return list(self.iter_find(name, class_, id, attrs))
+
+    def iter_find(self, name=None, class_=None, id=None, attrs=None):
+        raise NotImplementedError
+
+    def iter_events(self, start_tags, end_tags=()):
+        """
+        Duyệt cây một lần theo thứ tự tài liệu. Sinh ra ("start", tag, node)
+        khi vào một thẻ trong `start_tags` và ("end", tag, node) khi ra khỏi
+        một thẻ trong `end_tags`.
+        """
+        raise NotImplementedError
+
+    def get(self, attr: str, default=None):
+        raise NotImplementedError
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        raise NotImplementedError
+
+    def decompose(self):
+        raise NotImplementedError
+
+    @property
+    def parent(self):
+        raise NotImplementedError
+
+    @property
+    def key(self):
+        """Định danh ổn định của phần tử (giữ nguyên khi truy cập lại)."""
+        return id(self.el)
+
+
+# --- Backend BeautifulSoup ---
+
+
+class SoupNode(HTMLNode):
+    __slots__ = ("el",)
+
+    def __init__(self, el):
+        self.el = el
+
+    @property
+    def tag(self):
+        return self.el.name or ""
+
+    def iter_find(self, name=None, class_=None, id=None, attrs=None):
+        kwargs = {}
+        if class_ is not None:
+            kwargs["class_"] = class_
+        if id is not None:
+            kwargs["id"] = id
+        query_attrs = dict(attrs or {})
+        for el in self.el.find_all(name, attrs=query_attrs, **kwargs):
+            yield SoupNode(el)
+
+    def iter_events(self, start_tags, end_tags=()):
+        start_tags, end_tags = set(start_tags), set(end_tags)
+        stack = [(None, iter(self.el.children))]
+        while stack:
+            el, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                if el is not None and el.name in end_tags:
+                    yield "end", el.name, SoupNode(el)
+                continue
+            if isinstance(child, Tag):
+                if child.name in start_tags:
+                    yield "start", child.name, SoupNode(child)
+                stack.append((child, iter(child.children)))
+
+    def get(self, attr, default=None):
+        value = self.el.get(attr, default)
+        if isinstance(value, list):
+            return " ".join(value)
+        return value
+
+    def get_text(self, separator="", strip=False):
+        return self.el.get_text(separator, strip=strip)
+
+    def decompose(self):
+        self.el.decompose()
+
+    @property
+    def parent(self):
+        parent = self.el.parent
+        return SoupNode(parent) if parent is not None else None
+
+
+# --- Backend lxml ---
+
+
+class LxmlNode(HTMLNode):
+    __slots__ = ("el",)
+
+    def __init__(self, el):
+        self.el = el
+
+    @property
+    def tag(self):
+        tag = self.el.tag
+        return tag if isinstance(tag, str) else ""
+
+    def iter_find(self, name=None, class_=None, id=None, attrs=None):
+        if name is None:
+            tags = ()
+        elif isinstance(name, str):
+            tags = (name,)
+        else:
+            tags = tuple(name)
+        for el in self.el.iter(*tags):
+            if el is self.el or not isinstance(el.tag, str):
+                continue
+            if id is not None and el.get("id") != id:
+                continue
+            if class_ is not None and not match_class(el.get("class"), class_):
+                continue
+            if not _match_attrs(el.get, attrs):
+                continue
+            yield LxmlNode(el)
+
+    def iter_events(self, start_tags, end_tags=()):
+        # iterwalk lọc thẻ ở tầng C, Python chỉ xử lý các thẻ cần thiết
+        start_tags, end_tags = set(start_tags), set(end_tags)
+        root = self.el
+        for event, el in etree.iterwalk(
+            root, events=("start", "end"), tag=tuple(start_tags | end_tags)
+        ):
+            tag = el.tag
+            wanted = start_tags if event == "start" else end_tags
+            if tag not in wanted or el is root:
+                continue
+            yield event, tag, LxmlNode(el)
+
+    def get(self, attr, default=None):
+        return self.el.get(attr, default)
+
+    def get_text(self, separator="", strip=False):
+        texts = self.el.itertext()
+        if strip:
+            texts = (t.strip() for t in texts)
+            texts = (t for t in texts if t)
+        return separator.join(texts)
+
+    def decompose(self):
+        # Giống lxml.html drop_tree: xóa phần tử nhưng giữ lại phần tail text
+        el = self.el
+        parent = el.getparent()
+        if parent is None:
+            return
+        if el.tail:
+            previous = el.getprevious()
+            if previous is None:
+                parent.text = (parent.text or "") + el.tail
+            else:
+                previous.tail = (previous.tail or "") + el.tail
+        parent.remove(el)
+
+    @property
+    def parent(self):
+        parent = self.el.getparent()
+        return LxmlNode(parent) if parent is not None else None
+
+
+def _decode(content: Union[bytes, str]) -> str:
+    if isinstance(content, str):
+        return content
+    match = _CHARSET_RE.search(content[:4096])
+    encoding = match.group(1).decode("ascii", "ignore") if match else "utf-8"
+    try:
+        return content.decode(encoding, errors="replace")
+    except LookupError:
+        return content.decode("utf-8", errors="replace")
+
+
+def _parse_lxml(content) -> HTMLNode:
+    text = _XML_DECL_RE.sub("", _decode(content), count=1)
+    # etree.HTMLParser (không dùng lxml.html) để tránh lookup class phần tử
+    # bằng Python ở mỗi lần truy cập node
+    parser = etree.HTMLParser(remove_comments=True, remove_pis=True)
+    root = None
+    try:
+        root = etree.fromstring(text, parser=parser)
+    except (etree.ParserError, ValueError):
+        pass
+    if root is None:
+        root = etree.fromstring("<html><body></body></html>", parser=parser)
+    return LxmlNode(root)
+
+
+def _parse_bs4(content) -> HTMLNode:
+    return SoupNode(BeautifulSoup(content, "html.parser"))
+
+
+PARSER_BACKENDS = {"lxml": _parse_lxml, "bs4": _parse_bs4}
+
+
+def resolve_backend(backend: Optional[str]) -> str:
+    backend = (backend or "bs4").lower()
+    if backend not in PARSER_BACKENDS:
+        logger.warning(f"Unknown HTML parser '{backend}', using bs4")
+        return "bs4"
+    if backend == "lxml" and not LXML_AVAILABLE:
+        logger.warning("lxml not available, falling back to bs4 (html.parser)")
+        return "bs4"
+    return backend
+
+
+def parse_html(content: Union[bytes, str], backend: str = "bs4") -> HTMLNode:
+    """Parse HTML bằng backend đã chọn, trả về node gốc của tài liệu."""
+    return PARSER_BACKENDS[resolve_backend(backend)](content)
@@ -0,0 +1,93 @@
+import logging
+import threading
+from contextlib import contextmanager
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlparse
+
+import requests
+from curl_cffi import CurlOpt
+from curl_cffi import requests as cffi_requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Session dùng chung toàn process, tạo lười ở lần dùng đầu tiên.
+# Giữ kết nối keep-alive tới các trang báo và googleapis.com giữa các request.
+# Session KHÔNG giữ cookie giữa các request: cookie consent/paywall của một
+# trang không được lọt sang request khác, và jar không bị nhiều thread cùng
+# ghi. Cookie vẫn có hiệu lực trong chuỗi redirect của một request.
+_lock = threading.Lock()
+_requests_session = None
+_cffi_session = None
+_host_semaphores = {}
+
+
+def get_requests_session() -> requests.Session:
+    """
+    requests.Session dùng chung, thread-safe cho GET đơn giản.
+    pool_maxsize giới hạn số kết nối đồng thời tới MỖI host (pool_block=True).
+    """
+    global _requests_session
+    if _requests_session is None:
+        with _lock:
+            if _requests_session is None:
+                session = requests.Session()
+                # Chặn mọi cookie vào jar dùng chung (allowed_domains rỗng)
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                adapter = HTTPAdapter(
+                    pool_connections=Config.HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=Config.HTTP_POOL_MAXSIZE,
+                    pool_block=True,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _requests_session = session
+                logger.info(
+                    f"HTTP pool: {Config.HTTP_POOL_CONNECTIONS} hosts x "
+                    f"{Config.HTTP_POOL_MAXSIZE} connections"
+                )
+    return _requests_session
+
+
+def get_cffi_session() -> cffi_requests.Session:
+    """
+    curl_cffi Session dùng chung. Mỗi thread có curl handle riêng
+    (use_thread_local_curl), nên an toàn khi gọi từ nhiều thread và vẫn
+    tái sử dụng kết nối TLS trong cùng một thread.
+    """
+    global _cffi_session
+    if _cffi_session is None:
+        with _lock:
+            if _cffi_session is None:
+                _cffi_session = cffi_requests.Session(
+                    use_thread_local_curl=True,
+                    discard_cookies=True,
+                    curl_options={CurlOpt.MAXCONNECTS: Config.HTTP_POOL_MAXSIZE},
+                )
+    return _cffi_session
+
+
+@contextmanager
+def host_slot(url: str):
+    """Giới hạn số kết nối curl_cffi đồng thời tới cùng một host."""
+    host = urlparse(url).netloc
+    with _lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(Config.HTTP_POOL_MAXSIZE)
+            _host_semaphores[host] = semaphore
+    with semaphore:
+        yield
+
+
+def close_sessions():
+    global _requests_session, _cffi_session
+    with _lock:
+        if _requests_session is not None:
+            _requests_session.close()
+            _requests_session = None
+        if _cffi_session is not None:
+            _cffi_session.close()
+            _cffi_session = None
@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_BITS = 64
+# Số từ trong một shingle: đủ dài để hai bài cùng chủ đề nhưng khác nội dung
+# không bị coi là bản sao
+SHINGLE_SIZE = 3
+
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(token.encode(), digest_size=8).digest(), "big"
+    )
+
+
+def simhash(text: str, shingle_size: int = SHINGLE_SIZE) -> int:
+    """SimHash 64 bit trên các shingle `shingle_size` từ liên tiếp của `text`."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = [
+            " ".join(words[i : i + shingle_size])
+            for i in range(len(words) - shingle_size + 1)
+        ]
+    if not shingles:
+        return 0
+    hashes = np.fromiter(
+        (_hash64(shingle) for shingle in shingles), dtype=np.uint64, count=len(shingles)
+    )
+    # Mỗi bit: số shingle có bit 1 trừ số shingle có bit 0
+    bits = (
+        hashes[:, None] >> np.arange(FINGERPRINT_BITS, dtype=np.uint64)
+    ) & np.uint64(1)
+    weights = 2 * bits.sum(axis=0).astype(np.int64) - len(shingles)
+    return sum(1 << int(bit) for bit in np.flatnonzero(weights > 0))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class DuplicateIndex:
+    """
+    Chỉ mục SimHash của các bài đã crawl, theo article_key.
+
+    Hai bài có khoảng cách Hamming <= `max_distance` là bản sao gần nhau
+    (tin đăng lại giữa các báo) và thuộc cùng một cụm, đại diện bởi bài được
+    thấy đầu tiên. Tìm ứng viên bằng LSH: fingerprint chia thành
+    `max_distance + 1` dải bit, hai fingerprint đủ gần chắc chắn trùng nhau ở
+    ít nhất một dải (nguyên lý Dirichlet).
+
+    Nếu có `store` (ArticleStore), fingerprint được lưu lại và nạp lên khi
+    khởi động, nên các request sau biết trước bài nào là bản sao.
+    """
+
+    def __init__(self, max_distance: int = 5, max_entries: int = 50000, store=None):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.store = store
+        n_bands = max_distance + 1
+        width = FINGERPRINT_BITS // n_bands
+        # Dải cuối lấy phần bit còn dư
+        self._bands = [
+            (i * width, FINGERPRINT_BITS if i == n_bands - 1 else (i + 1) * width)
+            for i in range(n_bands)
+        ]
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (fingerprint, cụm)
+        self._buckets: Dict[tuple, set] = {}
+        self.added = 0
+        self.duplicates = 0
+        self.collapsed = 0
+        self.skipped_fetches = 0
+        if store is not None:
+            for key, fingerprint, cluster in store.load_fingerprints(max_entries):
+                self._insert(key, fingerprint, cluster)
+            if self._entries:
+                logger.info(
+                    f"Duplicate index: loaded {len(self._entries)} fingerprints"
+                )
+
+    def _band_keys(self, fingerprint):
+        return [
+            (i, (fingerprint >> lo) & ((1 << (hi - lo)) - 1))
+            for i, (lo, hi) in enumerate(self._bands)
+        ]
+
+    def _insert(self, key, fingerprint, cluster):
+        self._entries[key] = (fingerprint, cluster)
+        for band in self._band_keys(fingerprint):
+            self._buckets.setdefault(band, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            old_key, (old_fingerprint, _) = self._entries.popitem(last=False)
+            for band in self._band_keys(old_fingerprint):
+                bucket = self._buckets.get(band)
+                if bucket is not None:
+                    bucket.discard(old_key)
+                    if not bucket:
+                        del self._buckets[band]
+
+    def cluster(self, key: str) -> str:
+        """Khóa đại diện cho cụm của `key` (chính `key` nếu chưa biết)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry else key
+
+    def fingerprint(self, key: str) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+    def add(self, key: str, fingerprint: int) -> str:
+        """Thêm bài vào chỉ mục, trả về khóa đại diện cho cụm của nó."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[1]
+            cluster = key
+            candidates = set()
+            for band in self._band_keys(fingerprint):
+                candidates |= self._buckets.get(band, set())
+            best = None
+            for other in candidates:
+                distance = hamming(fingerprint, self._entries[other][0])
+                if distance <= self.max_distance and (
+                    best is None or distance < best[0]
+                ):
+                    best = (distance, other)
+            if best is not None:
+                cluster = self._entries[best[1]][1]
+                self.duplicates += 1
+            self._insert(key, fingerprint, cluster)
+            self.added += 1
+        if self.store is not None:
+            self.store.add_fingerprint(key, fingerprint, cluster)
+        return cluster
+
+    def record(self, collapsed: int = 0, skipped_fetches: int = 0):
+        """Ghi nhận số bài bị gộp trước bước so sánh / bỏ qua không crawl."""
+        with self._lock:
+            self.collapsed += collapsed
+            self.skipped_fetches += skipped_fetches
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_distance": self.max_distance,
+                "added": self.added,
+                "duplicates": self.duplicates,
+                "collapsed": self.collapsed,
+                "skipped_fetches": self.skipped_fetches,
+                "persistent": self.store is not None,
+            }
@@ -0,0 +1,59 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict
+
+
+class NegativeCache:
+    """
+    Ghi nhớ ngắn hạn các lần thất bại "chắc chắn" (truy vấn không có kết
+    quả, URL không crawl được) để không lặp lại chúng trong `ttl_seconds`.
+
+    Giới hạn LRU `max_entries`; phần tử hết hạn bị xóa khi được đọc lại.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 5000):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> expires_at (monotonic)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.added = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            expires_at = self._data.get(key)
+            if expires_at is None:
+                return False
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                self.expirations += 1
+                return False
+            self.hits += 1
+            return True
+
+    def add(self, key: str):
+        with self._lock:
+            self._data[key] = time.monotonic() + self.ttl
+            self._data.move_to_end(key)
+            self.added += 1
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "ttl_minutes": self.ttl / 60,
+                "hits": self.hits,
+                "added": self.added,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,306 @@
+"""
+Nạp trước bài báo từ RSS / sitemap của các nguồn uy tín vào ArticleStore.
+
+Chạy nền cùng API (PREFETCH_ENABLED=true) hoặc chạy một lần từ dòng lệnh:
+    python prefetcher.py [--feed URL ...] [--store articles.sqlite3]
+"""
+
+import argparse
+import logging
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+
+from article_store import ArticleStore
+from config import Config
+from crawl_scheduler import get_crawl_scheduler, shutdown_crawl_scheduler
+from http_pool import get_requests_session
+from url_utils import article_key, host_key
+
+logger = logging.getLogger(__name__)
+
+# Feed "tin mới nhất" của các nguồn trong WebSearcher.trusted_sources
+DEFAULT_FEEDS = [
+    "https://vnexpress.net/rss/tin-moi-nhat.rss",
+    "https://tuoitre.vn/rss/tin-moi-nhat.rss",
+    "https://thanhnien.vn/rss/home.rss",
+    "https://dantri.com.vn/rss/home.rss",
+    "https://vietnamnet.vn/rss/tin-moi-nong.rss",
+]
+
+# Số sitemap con tối đa được đọc từ một sitemap index (mới nhất thường ở đầu)
+MAX_CHILD_SITEMAPS = 3
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1].lower()
+
+
+def parse_feed(content: bytes) -> Tuple[str, List[Tuple[str, Optional[str]]]]:
+    """
+    Đọc RSS 2.0, Atom, sitemap hoặc sitemap index.
+    Trả về (loại, [(url, ngày đăng)]); với "sitemapindex" các url là sitemap con.
+    """
+    try:
+        root = ET.fromstring(content)
+    except ET.ParseError as e:
+        logger.warning(f"Invalid feed XML: {e}")
+        return "unknown", []
+
+    kind = _local_name(root.tag)
+    entries = []
+    if kind in ("urlset", "sitemapindex"):
+        item_tag = "url" if kind == "urlset" else "sitemap"
+        for item in root:
+            if _local_name(item.tag) != item_tag:
+                continue
+            fields = {_local_name(child.tag): child for child in item}
+            loc = fields.get("loc")
+            if loc is not None and loc.text:
+                lastmod = fields.get("lastmod")
+                entries.append(
+                    (loc.text.strip(), lastmod.text if lastmod is not None else None)
+                )
+        return kind, entries
+
+    for item in root.iter():
+        name = _local_name(item.tag)
+        if name not in ("item", "entry"):
+            continue
+        link, published = None, None
+        for child in item:
+            child_name = _local_name(child.tag)
+            if child_name == "link":
+                # RSS: <link>url</link>; Atom: <link href="url"/>
+                link = (child.text or "").strip() or child.get("href")
+            elif child_name in ("pubdate", "published", "updated"):
+                published = published or (child.text or "").strip() or None
+        if link:
+            entries.append((link, published))
+    return ("atom" if kind == "feed" else "rss"), entries
+
+
+class FeedPrefetcher:
+    """
+    Poll định kỳ các feed, crawl các bài CHƯA có trong kho (incremental),
+    encode một lần cho cả đợt và lưu lại cùng embedding.
+
+    Chỉ nhận URL cùng host với feed, để feed lỗi không kéo trang ngoài vào kho.
+    Bài được crawl qua CrawlScheduler dùng chung, nên chịu cùng giới hạn số
+    request đồng thời và khoảng cách tối thiểu theo domain như các request
+    kiểm tra tin.
+    """
+
+    def __init__(
+        self,
+        store: ArticleStore,
+        crawler,
+        similarity_checker=None,
+        feeds: Optional[List[str]] = None,
+        max_per_feed: int = 30,
+        interval_minutes: float = 15,
+    ):
+        self.store = store
+        self.crawler = crawler
+        self.similarity_checker = similarity_checker
+        self.feeds = feeds or DEFAULT_FEEDS
+        self.max_per_feed = max_per_feed
+        self.interval = interval_minutes * 60
+        self._stop = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.stored = 0
+        self.failed = 0
+        self.last_run = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._loop, name="feed-prefetcher", daemon=True
+        )
+        self._thread.start()
+        logger.info(
+            f"Feed prefetcher started: {len(self.feeds)} feeds, "
+            f"every {self.interval / 60:.0f} min"
+        )
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Prefetch run failed: {e}", exc_info=True)
+            self._stop.wait(self.interval)
+
+    def run_once(self) -> Dict:
+        """Poll tất cả feed một lượt. Trả về thống kê của lượt này."""
+        summary = {"feeds": 0, "discovered": 0, "new": 0, "stored": 0, "failed": 0}
+        for feed_url in self.feeds:
+            if self._stop.is_set():
+                break
+            entries, validators = self._poll_feed(feed_url)
+            summary["feeds"] += 1
+            summary["discovered"] += len(entries)
+
+            known = self.store.known_urls(url for url, _ in entries)
+            unstored = [(url, pub) for url, pub in entries if url not in known]
+            new_entries = unstored[: self.max_per_feed]
+            summary["new"] += len(new_entries)
+
+            stored = self._ingest(new_entries)
+            summary["stored"] += stored
+            summary["failed"] += len(new_entries) - stored
+            if validators is not None and stored == len(unstored):
+                # Chỉ lưu ETag / Last-Modified khi mọi bài của feed đã vào kho:
+                # nếu không, lượt sau GET lại đầy đủ (không nhận 304) và thử
+                # lại các bài lỗi hoặc bị cắt bởi max_per_feed
+                self.store.set_feed_state(feed_url, *validators)
+
+        self.runs += 1
+        self.stored += summary["stored"]
+        self.failed += summary["failed"]
+        self.last_run = time.time()
+        logger.info(f"Prefetch run: {summary}")
+        return summary
+
+    def _fetch(self, url: str, conditional: bool = False):
+        """Response 200, hoặc None nếu lỗi / 304 Not Modified."""
+        headers = {"User-Agent": "Mozilla/5.0 (compatible; FakeNewsChecker/1.0)"}
+        state = self.store.feed_state(url) if conditional else None
+        if state:
+            if state["etag"]:
+                headers["If-None-Match"] = state["etag"]
+            if state["last_modified"]:
+                headers["If-Modified-Since"] = state["last_modified"]
+        try:
+            response = get_requests_session().get(url, headers=headers, timeout=15)
+        except Exception as e:
+            logger.warning(f"Feed fetch failed ({url}): {e}")
+            return None
+        if response.status_code == 304:
+            logger.info(f"Feed not modified: {url}")
+            self.store.set_feed_state(url, state["etag"], state["last_modified"])
+            return None
+        if response.status_code != 200:
+            logger.warning(f"Feed fetch failed ({url}): status {response.status_code}")
+            return None
+        return response
+
+    def _poll_feed(
+        self, feed_url: str
+    ) -> Tuple[List[Tuple[str, Optional[str]]], Optional[Tuple]]:
+        """
+        Trả về ([(url, ngày đăng)], (ETag, Last-Modified) của feed). Validator
+        chỉ được lưu sau khi các bài đã vào kho (xem run_once).
+        """
+        response = self._fetch(feed_url, conditional=True)
+        if response is None:
+            return [], None
+        validators = (
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+        kind, entries = parse_feed(response.content)
+        if kind == "sitemapindex":
+            sitemaps = entries[:MAX_CHILD_SITEMAPS]
+            entries = []
+            for sitemap_url, _ in sitemaps:
+                child = self._fetch(sitemap_url)
+                if child is not None:
+                    entries.extend(parse_feed(child.content)[1])
+
+        host = host_key(feed_url)
+        # Loại trùng theo bài (cùng bài có thể xuất hiện với tham số utm khác nhau)
+        unique = {}
+        for url, published in entries:
+            unique.setdefault(article_key(url), (url, published))
+        return [
+            (url, published)
+            for url, published in unique.values()
+            if host_key(url) == host and self.crawler.is_valid_article_url(url)
+        ], validators
+
+    def _ingest(self, entries: List[Tuple[str, Optional[str]]]) -> int:
+        # Chỉ fetch trực tiếp, không dùng archive/snippet: bài lỗi sẽ được thử
+        # lại ở lượt poll sau vì chưa có trong kho
+        # (Crawler đã chuẩn hóa title/description/content bằng normalize_text)
+        scheduler = get_crawl_scheduler()
+        futures = [
+            (scheduler.submit(url, self.crawler.fetch_direct, url), published)
+            for url, published in entries
+        ]
+        articles = []
+        for future, published in futures:
+            if self._stop.is_set():
+                future.cancel()
+                continue
+            try:
+                article = future.result()
+            except Exception as e:
+                logger.warning(f"Prefetch crawl failed: {e}")
+                continue
+            if article:
+                articles.append((article, published))
+
+        embeddings = [None] * len(articles)
+        if self.similarity_checker and articles:
+            # Encode cả đợt trong một lần gọi model
+            embeddings = self.similarity_checker.encode_many(
+                [article["content"] for article, _ in articles]
+            )
+        model_name = getattr(self.similarity_checker, "model_name", None)
+        for (article, published), embedding in zip(articles, embeddings):
+            self.store.add(article, embedding, model_name, published)
+        return len(articles)
+
+    def stats(self) -> Dict:
+        return {
+            "feeds": len(self.feeds),
+            "running": self._thread is not None and not self._stop.is_set(),
+            "runs": self.runs,
+            "stored": self.stored,
+            "failed": self.failed,
+            "last_run": self.last_run,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--feed", action="append", help="URL feed (lặp lại được)")
+    parser.add_argument("--store", default=Config.ARTICLE_STORE_PATH)
+    parser.add_argument(
+        "--max-per-feed", type=int, default=Config.PREFETCH_MAX_PER_FEED
+    )
+    parser.add_argument(
+        "--no-embeddings", action="store_true", help="Không load model embedding"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from crawler import Crawler
+
+    similarity_checker = None
+    if not args.no_embeddings:
+        from similarity_checker import SimilarityChecker
+
+        similarity_checker = SimilarityChecker()
+
+    prefetcher = FeedPrefetcher(
+        ArticleStore(args.store),
+        Crawler(),
+        similarity_checker,
+        feeds=args.feed or Config.PREFETCH_FEEDS,
+        max_per_feed=args.max_per_feed,
+    )
+    print(prefetcher.run_once())
+    print(prefetcher.store.stats())
+    shutdown_crawl_scheduler()
+
+
+if __name__ == "__main__":
+    main()
@@ -292,7 +292,10 @@ class TextPreprocessor:
         if not extracted:
             logger.error("Failed to extract content from URL")
             return None
+        return self._process_extracted(url, extracted)
 
+    def _process_extracted(self, url: str, extracted: Dict) -> Dict:
+        """Trích keyword từ bài đã crawl (dùng chung cho crawler đồng bộ và async)."""
         # === TỐI ƯU HIỆU NĂNG NLP (Từ lần trước) ===
         text_for_keywords = (
             f"{extracted['title']} "
@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import random
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Số URL mới kỳ vọng mỗi biến thể đóng góp khi chưa có dữ liệu (giữ thứ tự
+# cũ của build_smart_queries: top5 → top3 → top7)
+PRIOR_YIELD = {"top5": 4.0, "top3": 3.0, "top7": 2.0, "fallback": 1.0}
+
+
+class QueryPlanner:
+    """
+    Sắp xếp các biến thể truy vấn (top5/top3/top7/fallback) theo số URL
+    uy tín MỚI kỳ vọng, học từ thống kê các lần chạy trước.
+
+    Kỳ vọng của một biến thể là trung bình số URL mới nó đóng góp (chưa thu
+    được từ các biến thể khác), làm trơn với PRIOR_YIELD (tương đương
+    `prior_weight` lần chạy giả định), nên biến thể ít dữ liệu không bị đẩy
+    lên/xuống quá sớm. Với xác suất `explore_rate`, một biến thể xếp sau được
+    đưa lên chạy đầu tiên để vẫn có thống kê (tránh thứ hạng bị kẹt). Thống
+    kê có thể lưu ra file JSON (`state_path`) để giữ qua các lần restart.
+    """
+
+    def __init__(
+        self,
+        state_path: Optional[str] = None,
+        prior_weight: float = 5.0,
+        save_every: int = 20,
+        explore_rate: float = 0.1,
+    ):
+        self.state_path = state_path
+        self.prior_weight = prior_weight
+        self.save_every = save_every
+        self.explore_rate = explore_rate
+        self._lock = threading.Lock()
+        self._variants: Dict[str, Dict[str, int]] = {}
+        self._unsaved = 0
+        self.checks = 0
+        self.queries = 0
+        self.early_stops = 0
+        self.explorations = 0
+        self._load()
+
+    def _load(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                self._variants = json.load(f)
+            logger.info(f"Query planner state loaded: {self.state_path}")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Query planner state unreadable ({e}), starting fresh")
+
+    def _save(self):
+        # Ghi file tạm rồi đổi tên để không bao giờ để lại file JSON dở dang
+        tmp_path = f"{self.state_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._variants, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.warning(f"Query planner state write failed: {e}")
+
+    def expected_yield(self, variant: str) -> float:
+        with self._lock:
+            return self._expected_yield(variant)
+
+    def _expected_yield(self, variant):
+        counts = self._variants.get(variant, {})
+        prior = PRIOR_YIELD.get(variant, 1.0)
+        return (counts.get("new", 0) + prior * self.prior_weight) / (
+            counts.get("runs", 0) + self.prior_weight
+        )
+
+    def plan(self, variants: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """
+        Sắp xếp [(biến thể, truy vấn)] theo số URL mới kỳ vọng giảm dần. Khi
+        khám phá, một biến thể ngẫu nhiên phía sau được đưa lên chạy đầu tiên.
+        """
+        with self._lock:
+            ordered = sorted(variants, key=lambda v: -self._expected_yield(v[0]))
+            if len(ordered) > 1 and random.random() < self.explore_rate:
+                pick = random.randrange(1, len(ordered))
+                ordered[0], ordered[pick] = ordered[pick], ordered[0]
+                self.explorations += 1
+            return ordered
+
+    def record(self, variant: str, returned: int, new: float):
+        """
+        Ghi nhận một lần chạy: số URL trả về và số URL mới (chưa thu được;
+        URL mới do nhiều biến thể cùng trả về được chia phần cho mỗi biến thể).
+        """
+        with self._lock:
+            counts = self._variants.setdefault(
+                variant, {"runs": 0, "hits": 0, "returned": 0, "new": 0}
+            )
+            counts["runs"] += 1
+            counts["hits"] += returned > 0
+            counts["returned"] += returned
+            counts["new"] += new
+            self._unsaved += 1
+            if self.state_path and self._unsaved >= self.save_every:
+                self._unsaved = 0
+                self._save()
+
+    def record_check(self, executed: int, stopped_early: bool):
+        with self._lock:
+            self.checks += 1
+            self.queries += executed
+            self.early_stops += stopped_early
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "checks": self.checks,
+                "queries": self.queries,
+                "avg_queries_per_check": (
+                    round(self.queries / self.checks, 2) if self.checks else None
+                ),
+                "early_stops": self.early_stops,
+                "explorations": self.explorations,
+                "variants": {
+                    variant: {
+                        "runs": counts["runs"],
+                        "hit_rate": round(counts["hits"] / counts["runs"], 3),
+                        "avg_returned": round(counts["returned"] / counts["runs"], 2),
+                        "avg_new": round(counts["new"] / counts["runs"], 2),
+                        "expected_yield": round(self._expected_yield(variant), 2),
+                    }
+                    for variant, counts in self._variants.items()
+                    if counts["runs"]
+                },
+            }
+
+    def close(self):
+        with self._lock:
+            if self.state_path and self._unsaved:
+                self._unsaved = 0
+                self._save()
@@ -0,0 +1,78 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe.
+
+    Token được nạp lại với tốc độ `rate` token/giây, tối đa `capacity` token
+    (cho phép burst ngắn). acquire() chặn cho đến khi có đủ token hoặc hết
+    `timeout`.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.acquired += 1
+                    self.total_wait += now - start
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                with self._lock:
+                    self.rejected += 1
+                return False
+            time.sleep(wait)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate_per_second": self.rate,
+                "capacity": self.capacity,
+                "available": round(self._tokens, 2),
+                "acquired": self.acquired,
+                "rejected": self.rejected,
+                "avg_wait_seconds": (
+                    round(self.total_wait / self.acquired, 4) if self.acquired else 0.0
+                ),
+            }
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, rate: float, capacity: float) -> TokenBucket:
+    """Trả về limiter dùng chung toàn process cho `name` (tạo mới nếu chưa có)."""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = TokenBucket(rate, capacity)
+            _limiters[name] = limiter
+        return limiter
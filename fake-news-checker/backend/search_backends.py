@@ -0,0 +1,302 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from http_pool import get_requests_session
+from url_utils import article_key, is_trusted_domain
+
+logger = logging.getLogger(__name__)
+
+
+class SearchBackend:
+    """
+    Một nguồn kết quả tìm kiếm. Lớp con cài đặt `_search` và trả về
+    [{url, title, snippet, source, domain}] theo thứ tự liên quan giảm dần,
+    hoặc None nếu không tìm được (chưa cấu hình, hết quota...) - khác với
+    danh sách rỗng là "đã tìm nhưng không có kết quả".
+
+    - `timeout`: thời gian WebSearcher chờ backend cho mỗi truy vấn; quá hạn
+      thì kết quả của backend bị bỏ qua (chỉ giảm recall, không tăng độ trễ)
+    - `cacheable`: kết quả có nên đi qua cache tìm kiếm hay không
+    """
+
+    name = "base"
+    cacheable = True
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.results = 0
+        self.total_latency = 0.0
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    def search(self, query: str, num_results: int) -> Optional[List[Dict]]:
+        """Kết quả của `_search`; None nếu backend lỗi hoặc không tìm được."""
+        started = time.monotonic()
+        try:
+            results = self._search(query, num_results)
+        except Exception as e:
+            logger.error(f"   {self.name} search error: {str(e)[:100]}")
+            results, failed = None, True
+        else:
+            failed = False
+        with self._lock:
+            self.calls += 1
+            self.errors += failed
+            self.results += len(results or [])
+            self.total_latency += time.monotonic() - started
+        return results
+
+    def _search(self, query: str, num_results: int) -> Optional[List[Dict]]:
+        raise NotImplementedError
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "timeout_s": self.timeout,
+                "calls": self.calls,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "results": self.results,
+                "avg_latency_ms": (
+                    round(self.total_latency / self.calls * 1000, 1)
+                    if self.calls
+                    else None
+                ),
+            }
+
+
+class GoogleCSEBackend(SearchBackend):
+    """Google Custom Search, giới hạn trong các nguồn uy tín."""
+
+    name = "google"
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        cse_id: Optional[str],
+        trusted_domains: List[str],
+        rate_limiter,
+        rate_limit_timeout: float = 10,
+        timeout: float = 8,
+    ):
+        super().__init__(timeout)
+        self.api_key = api_key
+        self.cse_id = cse_id
+        self.trusted_domains = trusted_domains
+        self.rate_limiter = rate_limiter
+        self.rate_limit_timeout = rate_limit_timeout
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key and self.cse_id)
+
+    def _search(self, query, num_results):
+        if not self.available:
+            logger.warning(" Google API credentials not configured")
+            return None
+
+        url = "https://www.googleapis.com/customsearch/v1"
+        # site_filter vẫn lọc 5 trang báo uy tín
+        site_filter = " OR ".join(f"site:{d}" for d in self.trusted_domains)
+        params = {
+            "key": self.api_key,
+            "cx": self.cse_id,
+            "q": f"{query} ({site_filter})",
+            "num": min(10, num_results),  # Tối đa 10 kết quả mỗi lần gọi
+            "lr": "lang_vi",
+            "gl": "vn",
+            "dateRestrict": "m6",  # Ưu tiên tin mới (trong 6 tháng)
+        }
+
+        if not self.rate_limiter.acquire(timeout=self.rate_limit_timeout):
+            logger.warning(f"   CSE rate limit: query skipped '{query[:50]}'")
+            return None
+
+        logger.info(f" Google Custom Search API: {query}")
+        response = get_requests_session().get(url, params=params, timeout=10)
+        response.raise_for_status()
+        results = []
+        for item in response.json().get("items", []):
+            link = item.get("link", "")
+            # Đảm bảo kết quả trả về đúng là từ 5 trang này
+            if not is_trusted_domain(link, self.trusted_domains):
+                continue
+            results.append(
+                {
+                    "url": link,
+                    "title": item.get("title", ""),
+                    "snippet": item.get("snippet", ""),
+                    "source": "Google Search",
+                    "domain": urlparse(link).netloc,
+                }
+            )
+        logger.info(f"   Google API: Found {len(results)} articles")
+        return results
+
+
+class LocalIndexBackend(SearchBackend):
+    """
+    Tìm kiếm BM25 trên kho bài báo cục bộ (ArticleStore): không gọi mạng,
+    không tốn quota, và luôn thấy bài vừa được prefetch nên không cache.
+    """
+
+    name = "local"
+    cacheable = False
+
+    def __init__(self, store, timeout: float = 2):
+        super().__init__(timeout)
+        self.store = store
+
+    @property
+    def available(self) -> bool:
+        return self.store is not None
+
+    def _search(self, query, num_results):
+        if self.store is None:
+            return None
+        started = time.perf_counter()
+        results = [
+            {
+                "url": hit["url"],
+                "title": hit["title"],
+                "snippet": hit["snippet"],
+                "source": "Local Index",
+                "domain": hit["domain"],
+            }
+            for hit in self.store.search(query, limit=num_results)
+        ]
+        logger.info(
+            f"   Local index: Found {len(results)} articles "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        return results
+
+
+class NewsAPIBackend(SearchBackend):
+    """NewsAPI /v2/everything, lọc theo các domain uy tín."""
+
+    name = "newsapi"
+
+    def __init__(
+        self, api_key: Optional[str], trusted_domains: List[str], timeout: float = 8
+    ):
+        super().__init__(timeout)
+        self.api_key = api_key
+        self.trusted_domains = trusted_domains
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    def _search(self, query, num_results):
+        if not self.available:
+            return None
+        logger.info(f" NewsAPI: {query}")
+        response = get_requests_session().get(
+            "https://newsapi.org/v2/everything",
+            params={
+                "q": query,
+                "domains": ",".join(self.trusted_domains),
+                "sortBy": "relevancy",
+                "pageSize": min(100, num_results),
+            },
+            headers={"X-Api-Key": self.api_key},
+            timeout=10,
+        )
+        response.raise_for_status()
+        results = []
+        for article in response.json().get("articles", []):
+            link = article.get("url") or ""
+            if not is_trusted_domain(link, self.trusted_domains):
+                continue
+            results.append(
+                {
+                    "url": link,
+                    "title": article.get("title") or "",
+                    "snippet": article.get("description") or "",
+                    "source": "NewsAPI",
+                    "domain": urlparse(link).netloc,
+                }
+            )
+        logger.info(f"   NewsAPI: Found {len(results)} articles")
+        return results
+
+
+class HttpSearchBackend(SearchBackend):
+    """
+    Dịch vụ tìm kiếm HTTP nội bộ (stand-in cho CSE khi dev/test, hoặc một
+    search server riêng): GET {base_url}?q=...&num=... trả về JSON là một list
+    hoặc {"items": [...]}, mỗi phần tử có url (hoặc link), title, snippet.
+    Như các backend khác, chỉ giữ kết quả thuộc các domain uy tín.
+    """
+
+    name = "http"
+    cacheable = False
+
+    def __init__(
+        self, base_url: Optional[str], trusted_domains: List[str], timeout: float = 8
+    ):
+        super().__init__(timeout)
+        self.base_url = base_url
+        self.trusted_domains = trusted_domains
+
+    @property
+    def available(self) -> bool:
+        return bool(self.base_url)
+
+    def _search(self, query, num_results):
+        if not self.available:
+            return None
+        response = get_requests_session().get(
+            self.base_url, params={"q": query, "num": num_results}, timeout=10
+        )
+        response.raise_for_status()
+        data = response.json()
+        items = data.get("items", []) if isinstance(data, dict) else data
+        results = []
+        for item in items[:num_results]:
+            link = item.get("url") or item.get("link") or ""
+            if not is_trusted_domain(link, self.trusted_domains):
+                continue
+            results.append(
+                {
+                    "url": link,
+                    # Server tùy biến có thể trả null: chuẩn hóa về chuỗi rỗng
+                    "title": item.get("title") or "",
+                    "snippet": item.get("snippet") or "",
+                    "source": item.get("source") or "HTTP Search",
+                    "domain": urlparse(link).netloc,
+                }
+            )
+        logger.info(f"   HTTP search: Found {len(results)} articles")
+        return results
+
+
+def reciprocal_rank_fusion(ranked_lists: List[List[Dict]], k: int = 60) -> List[Dict]:
+    """
+    Gộp nhiều danh sách kết quả theo Reciprocal Rank Fusion:
+    score(bài) = Σ 1 / (k + hạng). Các URL cùng một bài (article_key) chỉ giữ
+    một bản (bản đầu tiên có snippet), thứ tự theo điểm giảm dần.
+    """
+    scores: Dict[str, float] = {}
+    best: Dict[str, Dict] = {}
+    for results in ranked_lists:
+        for rank, result in enumerate(results, 1):
+            key = article_key(result["url"])
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            if key not in best or (not best[key]["snippet"] and result["snippet"]):
+                best[key] = result
+    return [best[key] for key in sorted(scores, key=scores.get, reverse=True)]
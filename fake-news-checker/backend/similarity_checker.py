@@ -8,12 +8,35 @@ class SimilarityChecker:
 
     def __init__(self, model_name="paraphrase-multilingual-MiniLM-L12-v2"):
         print(f"Loading model: {model_name}...")
+        self.model_name = model_name
         self.model = SentenceTransformer(model_name)
         print("Model loaded successfully!")
 
     def encode_text(self, text):
         return self.model.encode(text, convert_to_tensor=True)
 
+    def encode_many(self, texts):
+        """Encode nhiều văn bản trong một lần gọi, trả về mảng numpy float32."""
+        return np.asarray(self.model.encode(list(texts)), dtype=np.float32)
+
+    def _encode_references(self, texts, known_embeddings=None):
+        """
+        Encode danh sách văn bản thành tensor. Văn bản có sẵn trong
+        `known_embeddings` (text -> vector, vd. từ ArticleStore) không cần
+        encode lại; phần còn lại được encode trong một lần gọi.
+        """
+        if not known_embeddings:
+            return self.model.encode(texts, convert_to_tensor=True)
+        missing = list(dict.fromkeys(t for t in texts if t not in known_embeddings))
+        encoded = dict(zip(missing, self.encode_many(missing))) if missing else {}
+        vectors = np.stack(
+            [
+                known_embeddings[t] if t in known_embeddings else encoded[t]
+                for t in texts
+            ]
+        ).astype(np.float32)
+        return torch.from_numpy(vectors).to(self.model.device)
+
     def calculate_similarity(self, text1, text2):
         embedding1 = self.encode_text(text1)
         embedding2 = self.encode_text(text2)
@@ -22,16 +45,55 @@ class SimilarityChecker:
 
         return float(similarity[0][0])
 
-    def calculate_similarity_batch(self, query_text, reference_texts):
+    def calculate_similarity_batch(
+        self, query_text, reference_texts, known_embeddings=None
+    ):
 
         query_embedding = self.encode_text(query_text)
 
-        reference_embeddings = self.model.encode(
-            reference_texts, convert_to_tensor=True
+        reference_embeddings = self._encode_references(
+            reference_texts, known_embeddings
         )
 
         similarities = util.cos_sim(query_embedding, reference_embeddings)[0]
 
+        return self._rank_results(reference_texts, similarities)
+
+    def calculate_similarity_many(
+        self, query_texts, reference_texts_list, known_embeddings=None
+    ):
+        """
+        Giống calculate_similarity_batch nhưng cho nhiều query cùng lúc:
+        toàn bộ văn bản (đã loại trùng) được encode trong MỘT lần gọi model.encode.
+        Trả về danh sách kết quả theo đúng thứ tự của query_texts.
+        """
+        unique_texts = list(
+            dict.fromkeys(
+                list(query_texts)
+                + [text for texts in reference_texts_list for text in texts]
+            )
+        )
+        if not unique_texts:
+            return [[] for _ in query_texts]
+
+        embeddings = self._encode_references(unique_texts, known_embeddings)
+        position = {text: idx for idx, text in enumerate(unique_texts)}
+
+        all_results = []
+        for query_text, reference_texts in zip(query_texts, reference_texts_list):
+            if not reference_texts:
+                all_results.append([])
+                continue
+            query_embedding = embeddings[position[query_text]]
+            reference_embeddings = embeddings[
+                [position[text] for text in reference_texts]
+            ]
+            similarities = util.cos_sim(query_embedding, reference_embeddings)[0]
+            all_results.append(self._rank_results(reference_texts, similarities))
+
+        return all_results
+
+    def _rank_results(self, reference_texts, similarities):
         results = []
         for idx, (text, sim) in enumerate(zip(reference_texts, similarities)):
             results.append({"text": text, "similarity": float(sim), "index": idx})
@@ -0,0 +1,71 @@
+import copy
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Gộp các lời gọi TRÙNG NHAU đang chạy đồng thời (single-flight).
+
+    Lời gọi đầu tiên với một key sẽ thực thi hàm; các lời gọi cùng key đến
+    trong lúc đó chỉ chờ và nhận lại (bản sao) kết quả của lời gọi đầu tiên.
+    Khi lời gọi đầu tiên kết thúc, key được giải phóng - đây KHÔNG phải cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            logger.info("Coalesced duplicate in-flight request")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                logger.info(f"Shared result with {call.waiters} duplicate request(s)")
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            "in_flight": in_flight,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+import baseline_extractor
+from crawler import Crawler
+from html_parser import LXML_AVAILABLE
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+PAGES = sorted(name for name in os.listdir(PAGES_DIR) if name.endswith(".html"))
+
+# Trang có HTML lỗi mà libxml2 sửa khác html.parser (xem bench_parsers.py):
+# <p> không đóng chứa một <div>, phần text trong và sau <div> bị lxml bỏ qua
+KNOWN_LXML_DIFFERENCES = {"example.com_bai-loi-html.html"}
+
+
+def _cases():
+    for name in PAGES:
+        yield pytest.param(name, "bs4", id=f"{name}-bs4")
+        marks = [pytest.mark.skipif(not LXML_AVAILABLE, reason="lxml missing")]
+        if name in KNOWN_LXML_DIFFERENCES:
+            # strict: khi lxml đã khớp baseline thì phải bỏ trang khỏi danh sách
+            marks.append(
+                pytest.mark.xfail(
+                    strict=True,
+                    reason="lxml repairs malformed <p> differently from html.parser",
+                )
+            )
+        yield pytest.param(name, "lxml", marks=marks, id=f"{name}-lxml")
+
+
+def _load(name):
+    # Như bench_parsers: tên file bắt đầu bằng domain
+    with open(os.path.join(PAGES_DIR, name), "rb") as f:
+        html = f.read()
+    domain = name.split("_")[0]
+    return html, f"https://{domain}/{os.path.splitext(name)[0]}-12345678.html"
+
+
+@pytest.mark.parametrize("name, backend", _cases())
+def test_extractor_matches_baseline(name, backend):
+    html, url = _load(name)
+
+    article = Crawler(parser_backend=backend)._parse_article(html, url)
+
+    assert article is not None
+    assert article == baseline_extractor.parse_article(html, url)
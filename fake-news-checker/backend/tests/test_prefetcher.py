@@ -0,0 +1,124 @@
+import http.server
+import threading
+import zlib
+
+import pytest
+
+from article_store import ArticleStore
+from config import Config
+from crawl_scheduler import get_crawl_scheduler, shutdown_crawl_scheduler
+from crawler import Crawler
+from prefetcher import FeedPrefetcher
+
+PARAGRAPH = (
+    "Ủy ban nhân dân thành phố cho biết dự án cải tạo kênh sẽ hoàn thành "
+    "trong năm nay, giúp giảm ngập cho hàng chục nghìn hộ dân khu vực lân cận."
+)
+
+
+def _article_html(title: str) -> bytes:
+    body = "".join(f"<p>{PARAGRAPH} ({title}, đoạn {i})</p>" for i in range(5))
+    return (
+        f"<html><head><title>{title}</title>"
+        f'<meta name="description" content="Mô tả {title}"></head>'
+        f"<body><article>{body}</article></body></html>"
+    ).encode()
+
+
+class _Site(http.server.BaseHTTPRequestHandler):
+    pages = {}
+
+    def do_GET(self):
+        body = self.pages.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = f'"{zlib.crc32(body)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site(monkeypatch):
+    monkeypatch.setattr(Config, "CRAWL_DOMAIN_MIN_INTERVAL_S", 0.0)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Site)
+    base = f"http://127.0.0.1:{server.server_port}"
+    rss_urls = [f"{base}/thoi-su/tin-rss-so-{i}-1234567{i}.html" for i in range(2)]
+    sitemap_url = f"{base}/kinh-te/tin-sitemap-so-1-12345679.html"
+    items = "".join(f"<item><link>{url}</link></item>" for url in rss_urls)
+    _Site.pages = {
+        "/rss.xml": f"<rss><channel>{items}</channel></rss>".encode(),
+        "/sitemap.xml": (
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f"<url><loc>{sitemap_url}</loc><lastmod>2026-10-01</lastmod></url>"
+            # Trang ngoài host của feed: không được nạp
+            "<url><loc>https://example.com/tin-ngoai-12345678.html</loc></url>"
+            "</urlset>"
+        ).encode(),
+    }
+    for url in rss_urls + [sitemap_url]:
+        _Site.pages[url[len(base) :]] = _article_html(url.rsplit("/", 1)[-1])
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield base, rss_urls + [sitemap_url]
+    server.shutdown()
+    server.server_close()
+    shutdown_crawl_scheduler()
+
+
+def test_run_once_stores_feed_and_sitemap_articles(site, tmp_path):
+    base, article_urls = site
+    store = ArticleStore(str(tmp_path / "articles.sqlite3"))
+    prefetcher = FeedPrefetcher(
+        store, Crawler(), feeds=[f"{base}/rss.xml", f"{base}/sitemap.xml"]
+    )
+
+    summary = prefetcher.run_once()
+
+    assert summary["stored"] == 3
+    assert summary["failed"] == 0
+    # Bài được crawl qua scheduler dùng chung (giới hạn theo domain)
+    assert get_crawl_scheduler().stats()["completed"] == 3
+    assert store.known_urls(article_urls) == set(article_urls)
+    stored = store.get_many(article_urls)
+    # Nội dung lưu đã qua normalize_text (chữ thường)
+    assert all("dự án cải tạo kênh" in stored[url]["content"] for url in article_urls)
+
+
+def test_run_once_skips_articles_already_in_store(site, tmp_path):
+    base, article_urls = site
+    store = ArticleStore(str(tmp_path / "articles.sqlite3"))
+    prefetcher = FeedPrefetcher(store, Crawler(), feeds=[f"{base}/rss.xml"])
+
+    assert prefetcher.run_once()["stored"] == 2
+    # Lượt sau: feed trả 304 (ETag) hoặc bài đã có trong kho → không crawl lại
+    assert prefetcher.run_once()["new"] == 0
+
+
+def test_unstored_articles_are_retried_although_feed_is_unchanged(site, tmp_path):
+    base, article_urls = site
+    path = article_urls[1][len(base) :]
+    page = _Site.pages.pop(path)
+    store = ArticleStore(str(tmp_path / "articles.sqlite3"))
+    prefetcher = FeedPrefetcher(store, Crawler(), feeds=[f"{base}/rss.xml"])
+
+    first = prefetcher.run_once()
+    assert (first["stored"], first["failed"]) == (1, 1)
+    # Feed chưa đổi nhưng còn bài chưa vào kho: ETag chưa được lưu nên feed
+    # được đọc lại đầy đủ và bài lỗi được thử lại
+    _Site.pages[path] = page
+    assert prefetcher.run_once()["stored"] == 1
+    assert store.known_urls(article_urls[:2]) == set(article_urls[:2])
+    # Đã nạp đủ: ETag được lưu, lượt sau nhận 304
+    assert prefetcher.run_once()["discovered"] == 0
@@ -0,0 +1,87 @@
+import re
+from typing import Iterable
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+# Tiền tố host của bản mobile / AMP / www: cùng một bài với host gốc
+HOST_PREFIXES = ("www.", "m.", "amp.", "mobile.")
+
+# Tham số theo dõi đã biết chắc (không đổi nội dung trang). Chỉ liệt kê tham
+# số quảng cáo/analytics chuẩn: tham số chung chung như "ref" hay "amp" có thể
+# mang nội dung thật ở một số trang, bỏ đi sẽ làm hai trang khác nhau trùng khóa
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "gclsrc",
+    "dclid",
+    "msclkid",
+    "mc_cid",
+    "mc_eid",
+    "zarsrc",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+# ID bài báo trong URL của các nguồn uy tín: cùng ID = cùng bài, bất kể slug
+# hay chuyên mục trong đường dẫn
+ARTICLE_ID_PATTERNS = {
+    "vnexpress.net": re.compile(r"-(\d{6,})\.html$"),
+    "tuoitre.vn": re.compile(r"-(\d{14,})\.htm$"),
+    "thanhnien.vn": re.compile(r"-(\d{14,})\.htm$"),
+    "dantri.com.vn": re.compile(r"-(\d{14,})\.htm$"),
+    "vietnamnet.vn": re.compile(r"-(\d{6,})\.html$"),
+}
+
+
+def host_key(url: str) -> str:
+    """Host viết thường, bỏ cổng và các tiền tố www./m./amp./mobile."""
+    host = (urlparse(url.strip()).hostname or "").rstrip(".")
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix):
+            return host[len(prefix) :]
+    return host
+
+
+def is_trusted_domain(url: str, trusted_domains: Iterable[str]) -> bool:
+    """Host của `url` là một domain uy tín hoặc subdomain của nó."""
+    host = host_key(url)
+    return any(host == d or host.endswith("." + d) for d in trusted_domains)
+
+
+def canonical_url(url: str) -> str:
+    """
+    Dạng chuẩn của URL: https, host theo host_key, bỏ fragment, bỏ tham số
+    theo dõi (các tham số còn lại được sắp xếp), bỏ biến thể AMP của đường
+    dẫn và dấu / cuối. URL không phải http(s) được trả về nguyên vẹn.
+    """
+    url = url.strip()
+    parsed = urlparse(url)
+    if parsed.scheme.lower() not in ("http", "https") or not parsed.hostname:
+        return url
+
+    path = re.sub(r"/{2,}", "/", parsed.path)
+    if path.startswith("/amp/"):
+        path = path[4:]
+    path = path.rstrip("/")
+    if path.endswith("/amp"):
+        path = path[:-4]
+    path = path.rstrip("/") or "/"
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunparse(("https", host_key(url), path, "", urlencode(query), ""))
+
+
+def article_key(url: str) -> str:
+    """
+    Khóa định danh bài báo, dùng cho mọi cache và bước loại trùng: với các
+    nguồn uy tín có ID trong URL là "domain/ID", còn lại là canonical_url.
+    """
+    canonical = canonical_url(url)
+    pattern = ARTICLE_ID_PATTERNS.get(host_key(canonical))
+    match = pattern.search(urlparse(canonical).path) if pattern else None
+    if match:
+        return f"{host_key(canonical)}/{match.group(1)}"
+    return canonical
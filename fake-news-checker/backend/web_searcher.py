@@ -2,15 +2,32 @@
 # (Nội dung này THAY THẾ HOÀN TOÀN file cũ - Chỉ dùng Google API)
 
 import hashlib
+import json
 import logging
+import os
+import sqlite3
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-from urllib.parse import quote_plus, urlparse
-
-import requests
+from typing import Dict, List, Optional, Tuple
+
+from negative_cache import NegativeCache
+from query_planner import QueryPlanner
+from rate_limiter import get_rate_limiter
+from url_utils import article_key
+from search_backends import (
+    GoogleCSEBackend,
+    HttpSearchBackend,
+    LocalIndexBackend,
+    NewsAPIBackend,
+    SearchBackend,
+    reciprocal_rank_fusion,
+)
 
-# (Đã gỡ bỏ các import không cần thiết như ThreadPoolExecutor, BeautifulSoup, v.v.)
+# (Đã gỡ bỏ các import không cần thiết như BeautifulSoup, v.v.)
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -19,27 +36,244 @@ logger = logging.getLogger(__name__)
 
 
 class SmartCache:
-    def __init__(self, ttl_hours: int = 24):
-        self.cache = {}
+    """
+    Cache kết quả tìm kiếm trong bộ nhớ, có giới hạn kích thước.
+
+    - Loại bỏ theo LRU khi vượt quá `max_entries` hoặc `max_bytes`
+    - Định kỳ quét và xóa các phần tử đã hết hạn (không chỉ khi đọc)
+    """
+
+    def __init__(
+        self,
+        ttl_hours: int = 24,
+        max_entries: int = 1000,
+        max_bytes: int = 50 * 1024 * 1024,
+        sweep_interval_seconds: int = 300,
+    ):
+        self.cache = OrderedDict()  # key -> (data, timestamp, size_bytes)
         self.ttl = timedelta(hours=ttl_hours)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = timedelta(seconds=sweep_interval_seconds)
+        self.current_bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._last_sweep = datetime.now()
+        self._lock = threading.Lock()
 
     def _get_key(self, query: str) -> str:
         return hashlib.md5(query.encode()).hexdigest()
 
+    def _estimate_size(self, data: List) -> int:
+        return len(json.dumps(data, ensure_ascii=False, default=str).encode())
+
+    def _remove(self, key: str):
+        _, _, size = self.cache.pop(key)
+        self.current_bytes -= size
+
     def get(self, query: str) -> Optional[List]:
         key = self._get_key(query)
-        if key in self.cache:
-            data, timestamp = self.cache[key]
-            if datetime.now() - timestamp < self.ttl:
-                logger.info(f"Cache HIT: {query[:50]}")
-                return data
-            else:
-                del self.cache[key]
+        with self._lock:
+            if key in self.cache:
+                data, timestamp, _ = self.cache[key]
+                if datetime.now() - timestamp < self.ttl:
+                    self.cache.move_to_end(key)
+                    logger.info(f"Cache HIT: {query[:50]}")
+                    return data
+                else:
+                    self._remove(key)
+                    self.expirations += 1
         return None
 
     def set(self, query: str, data: List):
         key = self._get_key(query)
-        self.cache[key] = (data, datetime.now())
+        size = self._estimate_size(data)
+        if size > self.max_bytes:
+            logger.warning(f"Cache entry too large ({size} bytes), skipped")
+            return
+        with self._lock:
+            now = datetime.now()
+            if key in self.cache:
+                self._remove(key)
+            self.cache[key] = (data, now, size)
+            self.current_bytes += size
+
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep_expired(now)
+
+            while (
+                len(self.cache) > self.max_entries
+                or self.current_bytes > self.max_bytes
+            ):
+                oldest_key = next(iter(self.cache))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def _sweep_expired(self, now: datetime):
+        expired = [
+            key
+            for key, (_, timestamp, _) in self.cache.items()
+            if now - timestamp >= self.ttl
+        ]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        self._last_sweep = now
+        if expired:
+            logger.info(f"Cache sweep: removed {len(expired)} expired entries")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "size": len(self.cache),
+                "max_entries": self.max_entries,
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class SQLiteCache:
+    """
+    Cache kết quả tìm kiếm trên đĩa (SQLite, WAL mode).
+
+    Cùng interface get/set và TTL với SmartCache, nhưng được chia sẻ giữa
+    các uvicorn worker và giữ nguyên sau mỗi lần deploy/restart.
+    Các dòng hết hạn được dọn định kỳ bởi một thread nền.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        ttl_hours: int = 24,
+        compact_interval_seconds: int = 600,
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_hours * 3600
+        self._local = threading.local()
+        # Mọi connection đã mở (mỗi thread một cái), để close() đóng hết
+        self._conns: List[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_cache (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_search_cache_expires "
+            "ON search_cache (expires_at)"
+        )
+
+        self._stop = threading.Event()
+        self._compactor = threading.Thread(
+            target=self._compact_loop,
+            args=(compact_interval_seconds,),
+            name="search-cache-compactor",
+            daemon=True,
+        )
+        self._compactor.start()
+        logger.info(f"SQLite search cache: {self.db_path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Mỗi thread dùng connection riêng; SQLite xử lý khóa giữa các process.
+        # check_same_thread=False chỉ để close() đóng được từ thread khác.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    def _get_key(self, query: str) -> str:
+        return hashlib.md5(query.encode()).hexdigest()
+
+    def get(self, query: str) -> Optional[List]:
+        try:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT data FROM search_cache WHERE key = ? AND expires_at > ?",
+                    (self._get_key(query), time.time()),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache read failed: {e}")
+            return None
+        if row:
+            logger.info(f"Cache HIT (sqlite): {query[:50]}")
+            return json.loads(row[0])
+        return None
+
+    def set(self, query: str, data: List):
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO search_cache (key, query, data, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    self._get_key(query),
+                    query,
+                    json.dumps(data, ensure_ascii=False),
+                    time.time() + self.ttl_seconds,
+                ),
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache write failed: {e}")
+
+    def compact(self) -> int:
+        """Xóa các dòng đã hết hạn. Trả về số dòng bị xóa."""
+        cursor = self._connect().execute(
+            "DELETE FROM search_cache WHERE expires_at <= ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+    def _compact_loop(self, interval: int):
+        while not self._stop.wait(interval):
+            try:
+                removed = self.compact()
+                if removed:
+                    logger.info(f"SQLite cache compaction: removed {removed} rows")
+            except sqlite3.Error as e:
+                logger.warning(f"SQLite cache compaction failed: {e}")
+
+    def close(self):
+        """Dừng thread dọn dẹp và đóng mọi connection (SQLite gộp WAL khi đóng)."""
+        self._stop.set()
+        self._compactor.join(timeout=5)
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"SQLite cache close failed: {e}")
+
+    def stats(self) -> Dict:
+        try:
+            size = (
+                self._connect()
+                .execute("SELECT COUNT(*) FROM search_cache")
+                .fetchone()[0]
+            )
+        except sqlite3.Error:
+            size = None
+        return {"backend": "sqlite", "path": self.db_path, "size": size}
 
 
 class WebSearcher:
@@ -49,25 +283,30 @@ class WebSearcher:
         google_api_key: str = None,
         google_cse_id: str = None,
         cache_enabled: bool = True,
+        cache_backend: str = "memory",
+        cache_path: str = "search_cache.sqlite3",
+        cache_ttl_hours: int = 24,
+        cache_max_entries: int = 1000,
+        cache_max_bytes: int = 50 * 1024 * 1024,
+        negative_ttl_minutes: float = 10,
+        cse_rate_per_second: float = 1.5,
+        cse_burst: int = 3,
+        cse_rate_limit_timeout: float = 10,
+        local_store=None,
+        news_api_key: str = None,
+        http_search_url: str = None,
+        search_backends: str = "auto",
+        search_timeout: float = 8,
+        query_planner: bool = True,
+        planner_state_path: Optional[str] = None,
+        planner_width: int = 2,
+        planner_explore_rate: float = 0.1,
     ):
 
         self.google_api_key = google_api_key
         self.google_cse_id = google_cse_id
 
-        if self.google_api_key and self.google_cse_id:
-            logger.info(
-                f"Google API configured: Key={self.google_api_key[:10]}..., CSE={self.google_cse_id}"
-            )
-        else:
-            # Đây là một cảnh báo quan trọng trong logic mới
-            logger.error("=" * 70)
-            logger.error("Google API NOT configured. Search will NOT work.")
-            logger.error(
-                "Please add GOOGLE_API_KEY and GOOGLE_CSE_ID to your .env file."
-            )
-            logger.error("=" * 70)
-
-        # self.trusted_sources vẫn cần thiết để lọc kết quả của Google API
+        # self.trusted_sources vẫn cần thiết để lọc kết quả của các backend
         self.trusted_sources = {
             "vnexpress.net": {},
             "tuoitre.vn": {},
@@ -76,106 +315,277 @@ class WebSearcher:
             "vietnamnet.vn": {},
         }
 
-        self.cache = SmartCache(ttl_hours=24) if cache_enabled else None
+        if not cache_enabled:
+            self.cache = None
+        elif cache_backend == "sqlite":
+            self.cache = SQLiteCache(cache_path, ttl_hours=cache_ttl_hours)
+        else:
+            self.cache = SmartCache(
+                ttl_hours=cache_ttl_hours,
+                max_entries=cache_max_entries,
+                max_bytes=cache_max_bytes,
+            )
+
+        # Truy vấn không có kết quả: nhớ ngắn hạn để input rác không gọi lại CSE
+        self.negative_cache = (
+            NegativeCache(ttl_seconds=negative_ttl_minutes * 60)
+            if cache_enabled and negative_ttl_minutes > 0
+            else None
+        )
+
+        # Token bucket dùng chung toàn process cho quota Google CSE
+        self.rate_limiter = get_rate_limiter(
+            "google_cse", rate=cse_rate_per_second, capacity=cse_burst
+        )
+        self.rate_limit_timeout = cse_rate_limit_timeout
+
+        trusted_domains = list(self.trusted_sources.keys())
+        self.available_backends = {
+            backend.name: backend
+            for backend in (
+                GoogleCSEBackend(
+                    google_api_key,
+                    google_cse_id,
+                    trusted_domains,
+                    self.rate_limiter,
+                    rate_limit_timeout=cse_rate_limit_timeout,
+                    timeout=search_timeout,
+                ),
+                LocalIndexBackend(local_store),
+                NewsAPIBackend(news_api_key, trusted_domains, timeout=search_timeout),
+                HttpSearchBackend(
+                    http_search_url, trusted_domains, timeout=search_timeout
+                ),
+            )
+        }
+        self.backends: List[SearchBackend] = self._select_backends(search_backends)
+        # Pool dùng chung (không dùng `with`): backend chậm quá hạn vẫn chạy
+        # tiếp ở nền, caller không phải chờ nó kết thúc
+        self._pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="search")
+        # Chạy lần lượt các biến thể truy vấn theo số URL kỳ vọng, dừng khi đủ
+        self.planner = (
+            QueryPlanner(planner_state_path, explore_rate=planner_explore_rate)
+            if query_planner
+            else None
+        )
+        self.planner_width = planner_width
+
+        if self.backends:
+            logger.info(f"Search backends: {', '.join(b.name for b in self.backends)}")
+        else:
+            # Đây là một cảnh báo quan trọng trong logic mới
+            logger.error("=" * 70)
+            logger.error("No search backend configured. Search will NOT work.")
+            logger.error(
+                "Please add GOOGLE_API_KEY and GOOGLE_CSE_ID to your .env file."
+            )
+            logger.error("=" * 70)
 
         # (Đã gỡ bỏ UserAgentRotator và Session)
 
+    def _select_backends(self, search_backends: str) -> List[SearchBackend]:
+        """
+        "auto": mọi backend đã cấu hình; ngược lại là danh sách tên phân tách
+        bằng dấu phẩy (google, local, newsapi, http) theo thứ tự ưu tiên.
+        """
+        if search_backends == "auto":
+            return [b for b in self.available_backends.values() if b.available]
+        selected = []
+        for name in (n.strip() for n in search_backends.split(",")):
+            backend = self.available_backends.get(name)
+            if backend is None:
+                logger.warning(f"Unknown search backend '{name}', ignored")
+            elif not backend.available:
+                logger.error(f"Search backend '{name}' is not configured, ignored")
+            else:
+                selected.append(backend)
+        return selected
+
+    def register_backend(self, backend: SearchBackend):
+        """Thêm (hoặc thay thế theo tên) một backend tìm kiếm."""
+        self.available_backends[backend.name] = backend
+        self.backends = [b for b in self.backends if b.name != backend.name]
+        self.backends.append(backend)
+        logger.info(f"Search backend registered: {backend.name}")
+
+    def backend_stats(self) -> Dict:
+        return {backend.name: backend.stats() for backend in self.backends}
+
+    def close(self):
+        if self.planner:
+            self.planner.close()
+        if isinstance(self.cache, SQLiteCache):
+            self.cache.close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
     def build_smart_queries(self, keywords: List[str]) -> List[str]:
         """
         Xây dựng các truy vấn tìm kiếm SẠCH chỉ dựa trên
         các từ khóa chất lượng cao do PhoBERT cung cấp.
         """
+        return [query for _, query in self.build_query_variants(keywords)]
+
+    def build_query_variants(self, keywords: List[str]) -> List[Tuple[str, str]]:
+        """Như build_smart_queries, kèm tên biến thể: [(biến thể, truy vấn)]."""
         if not keywords:
             return []
-        queries = []
+        variants = []
 
         # Query 1: Top 5 keywords (Truy vấn chính)
         top_5_query = " ".join(keywords[:5])
         if len(top_5_query) > 10:
-            queries.append(top_5_query)
+            variants.append(("top5", top_5_query))
 
         # Query 2: Top 3 keywords (Truy vấn tập trung hơn)
         top_3_query = " ".join(keywords[:3])
-        if len(top_3_query) > 10 and top_3_query not in queries:
-            queries.append(top_3_query)
+        if len(top_3_query) > 10:
+            variants.append(("top3", top_3_query))
 
         # Query 3: Top 7 keywords (Truy vấn rộng hơn)
         top_7_query = " ".join(keywords[:7])
-        if len(top_7_query) > 10 and top_7_query not in queries:
-            queries.append(top_7_query)
+        if len(top_7_query) > 10:
+            variants.append(("top7", top_7_query))
 
-        if not queries and keywords:
+        if not variants and keywords:
             fallback_query = " ".join(keywords)
             if len(fallback_query) > 5:
-                queries.append(fallback_query)
+                variants.append(("fallback", fallback_query))
 
-        unique_queries = list(dict.fromkeys(queries))
-        return unique_queries[:3]
+        # Bỏ truy vấn trùng (vd. ít hơn 5 từ khóa thì top5 == top7)
+        unique_variants = {}
+        for variant, query in variants:
+            unique_variants.setdefault(query, variant)
+        return [(variant, query) for query, variant in unique_variants.items()][:3]
 
     def search_google_custom_api(self, query: str, num_results: int = 10) -> List[Dict]:
         """
         Chỉ tìm kiếm bằng Google API.
         """
-        if not self.google_api_key or not self.google_cse_id:
-            logger.warning(" Google API credentials not configured")
-            return []
+        return self.available_backends["google"].search(query, num_results) or []
 
-        try:
-            url = "https://www.googleapis.com/customsearch/v1"
-            # site_filter vẫn lọc 5 trang báo uy tín
-            site_filter = " OR ".join(
-                [f"site:{d}" for d in list(self.trusted_sources.keys())]
-            )
-            full_query = f"{query} ({site_filter})"
-
-            params = {
-                "key": self.google_api_key,
-                "cx": self.google_cse_id,
-                "q": full_query,
-                "num": min(10, num_results),  # Tối đa 10 kết quả mỗi lần gọi
-                "lr": "lang_vi",
-                "gl": "vn",
-                "dateRestrict": "m6",  # Ưu tiên tin mới (trong 6 tháng)
-            }
+    # (Đã gỡ bỏ các hàm: search_google_scraping, search_parallel, search_on_source_advanced)
 
-            logger.info(f" Google Custom Search API: {query}")
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            results = []
-
-            if "items" in data:
-                for item in data["items"]:
-                    link = item.get("link", "")
-                    # Đảm bảo kết quả trả về đúng là từ 5 trang này
-                    if not any(
-                        domain in link for domain in self.trusted_sources.keys()
-                    ):
-                        continue
-                    results.append(
-                        {
-                            "url": link,
-                            "title": item.get("title", ""),
-                            "snippet": item.get("snippet", ""),
-                            "source": "Google Search",  # Nguồn duy nhất
-                            "domain": urlparse(link).netloc,
-                        }
-                    )
-            logger.info(f"   Google API: Found {len(results)} articles")
-            return results
-        except Exception as e:
-            logger.error(f"   Google API error: {str(e)[:100]}")
+    def _run_query(
+        self, backend: SearchBackend, query: str, num_results: int
+    ) -> List[Dict]:
+        cache_key = f"{backend.name}:{query}"
+        if self.cache and backend.cacheable:
+            cached = self.cache.get(cache_key)
+            if cached:
+                return cached  # Nếu có cache, bỏ qua gọi API
+        if self.negative_cache and backend.cacheable:
+            if self.negative_cache.contains(cache_key):
+                logger.info(f"Negative cache HIT ({backend.name}): {query[:50]}")
+                return []
+
+        query_results = backend.search(query, num_results)
+        if query_results is None:
+            # Lỗi / hết quota: không cache gì cả, lần sau thử lại
             return []
 
-    # (Đã gỡ bỏ các hàm: search_google_scraping, search_parallel, search_on_source_advanced)
+        # Kết quả về muộn (sau timeout) vẫn được cache cho lần sau
+        if self.cache and backend.cacheable and query_results:
+            self.cache.set(cache_key, query_results)
+        elif self.negative_cache and backend.cacheable and not query_results:
+            self.negative_cache.add(cache_key)
+
+        return query_results
+
+    def _fan_out(self, queries: List[str], num_results: int) -> List[List[Dict]]:
+        return [
+            results
+            for query_lists in self._fan_out_by_query(queries, num_results)
+            for results in query_lists
+        ]
+
+    def _fan_out_by_query(
+        self, queries: List[str], num_results: int
+    ) -> List[List[List[Dict]]]:
+        """
+        Chạy mọi cặp (truy vấn, backend) song song. Mỗi backend được chờ tối
+        đa `backend.timeout` giây tính từ lúc bắt đầu; quá hạn thì bỏ qua.
+        Trả về, cho từng truy vấn, danh sách kết quả của các backend.
+        """
+        started = time.monotonic()
+        jobs = [
+            (
+                query,
+                backend,
+                self._pool.submit(self._run_query, backend, query, num_results),
+            )
+            for query in queries
+            for backend in self.backends
+        ]
+        by_query = {query: [] for query in queries}
+        for query, backend, future in jobs:
+            remaining = started + backend.timeout - time.monotonic()
+            try:
+                by_query[query].append(future.result(timeout=max(0.0, remaining)))
+            except FuturesTimeout:
+                backend.record_timeout()
+                logger.warning(
+                    f"   {backend.name} timed out after {backend.timeout}s: '{query[:50]}'"
+                )
+        return [by_query[query] for query in queries]
+
+    def _run_plan(
+        self, variants: List[Tuple[str, str]], num_results: int
+    ) -> List[List[Dict]]:
+        """
+        Chạy biến thể tốt nhất trước (thường đã đủ: một lần gọi CSE mỗi
+        check); nếu chưa đủ `num_results` bài khác nhau (theo article_key),
+        chạy các biến thể còn lại theo nhóm `planner_width` biến thể song
+        song (mỗi biến thể song song trên các backend), dừng ngay khi đủ.
+
+        Mỗi URL mới (chưa thu được ở các nhóm trước) được chia đều cho các
+        biến thể cùng nhóm đã trả về nó, nên biến thể chạy trước không được
+        ưu ái và thứ tự trong nhóm không ảnh hưởng thống kê.
+        """
+        ranked_lists = []
+        collected = set()
+        executed = 0
+        width = max(1, self.planner_width)
+        waves = [variants[:1]] + [
+            variants[start : start + width] for start in range(1, len(variants), width)
+        ]
+        for wave in waves:
+            wave_lists = self._fan_out_by_query([q for _, q in wave], num_results)
+            executed += len(wave)
+            returned = [
+                {
+                    article_key(result["url"])
+                    for results in query_lists
+                    for result in results
+                }
+                for query_lists in wave_lists
+            ]
+            for (variant, _), keys in zip(wave, returned):
+                new = sum(
+                    1 / sum(key in other for other in returned)
+                    for key in keys - collected
+                )
+                self.planner.record(variant, len(keys), new)
+            for query_lists, keys in zip(wave_lists, returned):
+                collected |= keys
+                ranked_lists.extend(query_lists)
+            if len(collected) >= num_results:
+                break
+        stopped_early = executed < len(variants)
+        if stopped_early:
+            logger.info(
+                f"  Query planner: {len(collected)} unique URLs after "
+                f"{executed}/{len(variants)} queries, stopping early"
+            )
+        self.planner.record_check(executed, stopped_early)
+        return ranked_lists
 
     def search_for_fact_check(
         self, processed_data: Dict, num_results: int = 10
     ) -> List[Dict]:
 
-        # Nếu API không được cấu hình, không làm gì cả
-        if not self.google_api_key or not self.google_cse_id:
-            logger.error(" Search aborted. Google API is not configured.")
+        # Nếu không có backend nào được cấu hình, không làm gì cả
+        if not self.backends:
+            logger.error(" Search aborted. No search backend is configured.")
             return []
 
         keywords = processed_data.get("keywords", [])
@@ -183,60 +593,40 @@ class WebSearcher:
             logger.error(" No keywords provided by preprocessor")
             return []
 
-        queries = self.build_smart_queries(keywords)
-        if not queries:
+        variants = self.build_query_variants(keywords)
+        if not variants:
             logger.error(" No valid queries generated from keywords")
             return []
+        if self.planner:
+            variants = self.planner.plan(variants)
 
         logger.info("=" * 70)
-        logger.info(" SEARCH STARTED (Google API Only)")
+        logger.info(f" SEARCH STARTED ({', '.join(b.name for b in self.backends)})")
         logger.info("=" * 70)
         logger.info(f"Using keywords: {keywords[:10]}")
-        logger.info(f"Generated {len(queries)} query variants:")
-        for i, q in enumerate(queries, 1):
-            logger.info(f"  {i}. {q}")
+        logger.info(f"Generated {len(variants)} query variants:")
+        for i, (variant, q) in enumerate(variants, 1):
+            logger.info(f"  {i}. [{variant}] {q}")
         logger.info("=" * 70)
 
-        all_results = []
-
-        # Lặp qua các truy vấn và CHỈ gọi Google API
-        for query_idx, query in enumerate(queries, 1):
-            logger.info(f"\n Query {query_idx}/{len(queries)}: '{query}'")
-
-            query_results = []
-            if self.cache:
-                cached = self.cache.get(query)
-                if cached:
-                    all_results.extend(cached)
-                    continue  # Nếu có cache, bỏ qua gọi API
-
-            # --- CHỈ CÒN LOGIC GỌI API ---
-            logger.info("  [Strategy 1] Google Custom Search API...")
-            api_results = self.search_google_custom_api(query, num_results)
-            query_results.extend(api_results)
-
-            if self.cache and query_results:
-                self.cache.set(query, query_results)
-
-            all_results.extend(query_results)
-            time.sleep(0.5)  # Thêm một chút delay để tránh rate limit
-
-        # (Đã gỡ bỏ tất cả các khối logic fallback)
+        if self.planner:
+            ranked_lists = self._run_plan(variants, num_results)
+        else:
+            # Chạy song song các truy vấn trên mọi backend; giới hạn tốc độ CSE
+            # do token bucket dùng chung toàn process đảm nhiệm
+            ranked_lists = self._fan_out([q for _, q in variants], num_results)
+        total_found = sum(len(results) for results in ranked_lists)
 
-        # De-duplicate (Loại bỏ trùng lặp)
-        unique_results = {}
-        for result in all_results:
-            url = result["url"]
-            if url not in unique_results:
-                unique_results[url] = result
+        # Gộp theo Reciprocal Rank Fusion, loại bỏ URL trùng lặp
+        unique_results = reciprocal_rank_fusion(ranked_lists)
 
         # Giới hạn số lượng kết quả cuối cùng
-        final_results = list(unique_results.values())[:num_results]
+        final_results = unique_results[:num_results]
 
         logger.info("\n" + "=" * 70)
         logger.info(f" SEARCH COMPLETED")
         logger.info(
-            f"Total found: {len(all_results)} → Unique: {len(unique_results)} → Final: {len(final_results)}"
+            f"Total found: {total_found} → Unique: {len(unique_results)} → Final: {len(final_results)}"
         )
         logger.info("=" * 70)
         for i, result in enumerate(final_results, 1):